@@ -1,5 +1,10 @@
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import threading
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -8,10 +13,16 @@ from config import settings
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Admin
+from metrics import Counter, Gauge, Histogram
 
 # Security scheme
 security = HTTPBearer()
 
+# Resolved admins keyed by token subject (email) -> (expires_at, Admin).
+# Cached objects are detached from any session, so only loaded columns are used.
+_admin_cache: dict[str, tuple[float, Admin]] = {}
+_admin_cache_lock = threading.Lock()
+
 
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
@@ -43,6 +54,162 @@ def authenticate_admin(db: Session, email: str, password: str):
     return admin
 
 
+# ---------------------------------------------------------------------------
+# Bounded password hashing pool
+# ---------------------------------------------------------------------------
+# bcrypt costs 100–300 ms of CPU per call. Running it on a small dedicated pool
+# keeps login bursts from tying up the threads that serve other requests; when
+# the pool and its queue are full new jobs are rejected immediately.
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password hashing pool has no free slot."""
+
+
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Time spent running bcrypt on the password pool",
+    ["operation"],
+)
+PASSWORD_QUEUE_SECONDS = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password jobs waited for a pool worker",
+)
+Gauge(
+    "password_hash_queue_depth",
+    "Password jobs waiting for a pool worker",
+    callback=lambda: _password_executor._work_queue.qsize(),
+)
+PASSWORD_POOL_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password jobs rejected because the pool was saturated",
+)
+LOGIN_THROTTLED = Counter(
+    "login_throttled_total",
+    "Login attempts rejected by login throttling",
+)
+
+
+def _submit_password_task(fn, *args) -> Future:
+    """Run fn(*args) on the password pool, or raise PasswordPoolBusy."""
+    if not _password_slots.acquire(blocking=False):
+        PASSWORD_POOL_REJECTED.inc()
+        raise PasswordPoolBusy()
+
+    submitted = time.perf_counter()
+
+    def run():
+        started = time.perf_counter()
+        PASSWORD_QUEUE_SECONDS.observe(started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            PASSWORD_HASH_SECONDS.observe(time.perf_counter() - started, operation=fn.__name__)
+
+    future = _password_executor.submit(run)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password pool without blocking the event loop"""
+    return await asyncio.wrap_future(
+        _submit_password_task(verify_password, plain_password, hashed_password)
+    )
+
+
+def hash_password_bounded(password: str) -> str:
+    """Hash a password on the password pool (for sync callers)"""
+    return _submit_password_task(hash_password, password).result()
+
+
+def password_pool_stats() -> dict:
+    """Pool sizing, queue depth and cumulative timings"""
+    jobs, hash_seconds = 0, 0.0
+    for operation in ("verify_password", "hash_password"):
+        count, total = PASSWORD_HASH_SECONDS.snapshot(operation=operation)
+        jobs += count
+        hash_seconds += total
+    _, queue_wait = PASSWORD_QUEUE_SECONDS.snapshot()
+    return {
+        "jobs": jobs,
+        "hash_seconds": round(hash_seconds, 3),
+        "queue_wait_seconds": round(queue_wait, 3),
+        "rejected": int(PASSWORD_POOL_REJECTED.value()),
+        "throttled_logins": int(LOGIN_THROTTLED.value()),
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "queue_size": settings.PASSWORD_HASH_QUEUE_SIZE,
+        "queued": _password_executor._work_queue.qsize(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Login throttling
+# ---------------------------------------------------------------------------
+# Failed attempts per client IP, and per (client IP, email) on top so one
+# account stops accepting guesses from an address before its whole budget is
+# spent. Most recently used last; bounded so a flood of distinct keys cannot
+# grow it without limit.
+_MAX_TRACKED_KEYS = 10_000
+_login_failures: "OrderedDict[tuple, deque[float]]" = OrderedDict()
+_login_failures_lock = threading.Lock()
+
+
+def _login_keys(ip: str, email: str) -> list[tuple[tuple, int]]:
+    """(key, failure limit) pairs a login attempt counts against."""
+    return [
+        (("ip", ip), settings.LOGIN_MAX_FAILURES),
+        (("email", ip, email.strip().lower()), settings.LOGIN_MAX_FAILURES_PER_EMAIL),
+    ]
+
+
+def login_retry_after(ip: str, email: str) -> int:
+    """Return seconds until ip may try email again, or 0 if it is not throttled"""
+    now = time.monotonic()
+    window = settings.LOGIN_FAILURE_WINDOW_SECONDS
+    retry_after = 0
+    with _login_failures_lock:
+        for key, limit in _login_keys(ip, email):
+            attempts = _login_failures.get(key)
+            if not attempts:
+                continue
+            while attempts and attempts[0] <= now - window:
+                attempts.popleft()
+            if len(attempts) >= limit:
+                retry_after = max(retry_after, int(attempts[-limit] + window - now) + 1)
+    if retry_after:
+        LOGIN_THROTTLED.inc()
+    return retry_after
+
+
+def record_login_failure(ip: str, email: str) -> None:
+    now = time.monotonic()
+    with _login_failures_lock:
+        for key, limit in _login_keys(ip, email):
+            attempts = _login_failures.pop(key, None) or deque(maxlen=limit)
+            attempts.append(now)
+            _login_failures[key] = attempts
+        while len(_login_failures) > _MAX_TRACKED_KEYS:
+            _login_failures.popitem(last=False)
+
+
+def reset_login_failures(ip: str, email: str) -> None:
+    """Clear the (ip, email) lockout after a successful login.
+
+    The per-IP budget is left alone so logging into one account cannot be
+    used to reset guessing against the others.
+    """
+    with _login_failures_lock:
+        _login_failures.pop(_login_keys(ip, email)[1][0], None)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -79,11 +246,37 @@ def verify_token(token: str) -> dict:
         )
 
 
-async def get_current_admin(
+def invalidate_admin_cache(email: Optional[str] = None) -> None:
+    """Drop a cached admin (or all of them) so the next request re-reads the DB"""
+    with _admin_cache_lock:
+        if email is None:
+            _admin_cache.clear()
+        else:
+            _admin_cache.pop(email, None)
+
+
+def _get_cached_admin(email: str) -> Optional[Admin]:
+    with _admin_cache_lock:
+        entry = _admin_cache.get(email)
+        if entry is None:
+            return None
+        expires_at, admin = entry
+        if expires_at < time.monotonic():
+            del _admin_cache[email]
+            return None
+        return admin
+
+
+def get_current_admin(
     credentials = Depends(security),
     db: Session = Depends(get_db),
 ) -> Admin:
-    """Get current authenticated admin"""
+    """Get current authenticated admin.
+
+    Declared sync so FastAPI runs it in the threadpool instead of blocking the
+    event loop. Admins are cached for ADMIN_CACHE_TTL_SECONDS, so most requests
+    never touch the admins table.
+    """
     token = credentials.credentials
     
     try:
@@ -102,10 +295,18 @@ async def get_current_admin(
             detail="Invalid credentials",
         )
 
+    admin = _get_cached_admin(email)
+    if admin is not None:
+        return admin
+
     admin = db.query(Admin).filter(Admin.email == email).first()
     if admin is None or not admin.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Admin not found or inactive",
         )
+
+    db.expunge(admin)
+    with _admin_cache_lock:
+        _admin_cache[email] = (time.monotonic() + settings.ADMIN_CACHE_TTL_SECONDS, admin)
     return admin
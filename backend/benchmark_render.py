@@ -0,0 +1,252 @@
+"""
+Benchmark certificate rendering
+Run: python benchmark_render.py                        (default resolutions)
+     python benchmark_render.py --count 200 --out bench.json
+     python benchmark_render.py --resolutions 1000x700,3508x2480
+
+Uses a throwaway SQLite database and the local storage backend, so it needs
+no network or configured services. Templates are synthetic images at each
+resolution and names come from a fixed corpus (long and non-Latin names
+included). For every resolution it measures:
+
+  render      _render_certificate called directly per certificate
+  workshop    generate_certificates_for_workshop end to end
+
+and writes certs/second, peak RSS and per-stage timings as JSON so runs
+from different versions can be diffed. Each resolution runs in a fresh
+subprocess, so its peak RSS is not inflated by the resolutions before it;
+the peak covers both benchmarks of that resolution.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+BENCH_STORAGE_DIR = f"bench-{uuid.uuid4().hex[:8]}"
+
+# Isolate the run before any app module reads settings
+_work_dir = Path(tempfile.mkdtemp(prefix="cert-bench-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_work_dir / 'bench.db'}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_DIR"] = BENCH_STORAGE_DIR
+os.environ["ENV"] = "benchmark"
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from database import SessionLocal, init_db  # noqa: E402
+from models import Certificate, CertificateTemplate, Workshop  # noqa: E402
+from services import certificate_service  # noqa: E402
+from storage import MEDIA_DIR, upload_image  # noqa: E402
+from tracing import SpanRecorder  # noqa: E402
+
+DEFAULT_RESOLUTIONS = "1000x707,2000x1414,3508x2480"
+
+NAMES = [
+    "Ada Lovelace",
+    "Alan Turing",
+    "Grace Hopper",
+    "Renée Françoise Østergård",
+    "Maximilian Alexander Konstantin von Habsburg-Lothringen der Jüngere",
+    "Pablo Diego José Francisco de Paula Juan Nepomuceno Ruiz y Picasso",
+    "Nguyễn Thị Minh Khai",
+    "Zoë Łukasiewicz-Żółkiewska",
+    "Александра Владимировна Кузнецова",
+    "Γεώργιος Παπαδόπουλος",
+    "محمد بن عبد الله الخوارزمي",
+    "שרה כהן",
+    "अनुराधा कृष्णमूर्ति",
+    "张伟",
+    "山田 太郎",
+    "김민준",
+    "O'Brien-MacDonald",
+    "X Æ A-12",
+]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process over its whole lifetime."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def synthetic_template(width: int, height: int, seed: int) -> bytes:
+    """A busy RGB certificate background (gradient, border, shapes) as PNG."""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.merge("RGB", (gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT), gradient.rotate(90)))
+    draw = ImageDraw.Draw(img)
+    border = max(4, width // 80)
+    draw.rectangle([border, border, width - border, height - border], outline="#1a1a2e", width=border)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(width // 50 + 1, width // 8 + 2)
+        draw.ellipse([x - r, y - r, x + r, y + r], outline=tuple(rng.randrange(256) for _ in range(3)), width=2)
+    buf = BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def setup_workshop(db, width: int, height: int, count: int, seed: int) -> Workshop:
+    """Create a workshop with one synthetic template and ``count`` pending certificates."""
+    workshop = Workshop(title=f"Bench {width}x{height}", date="2026-01-01", instructor="Bench")
+    db.add(workshop)
+    db.flush()
+
+    url = upload_image(workshop.id, synthetic_template(width, height, seed), "template.png", "image/png")
+    template = CertificateTemplate(event_id=workshop.id, image_url=url, image_width=width, image_height=height)
+    db.add(template)
+    db.flush()
+    workshop.active_template_id = template.id
+
+    rng = random.Random(seed)
+    for i in range(count):
+        db.add(Certificate(
+            code=f"BENCH-{width}-{i:06d}",
+            verification_code=f"BV-{width}-{i:06d}",
+            recipient_name=rng.choice(NAMES),
+            email=f"bench{i}@example.com",
+            workshop_name=workshop.title,
+            issue_date="2026-01-01",
+            skills=[],
+            instructor="Bench",
+        ))
+    db.commit()
+    return workshop
+
+
+def reset_certificates(db, workshop: Workshop) -> None:
+    db.query(Certificate).filter(Certificate.workshop_name == workshop.title).update(
+        {Certificate.status: "PENDING", Certificate.file_path: None}
+    )
+    db.commit()
+    shutil.rmtree(certificate_service.CERTIFICATES_DIR, ignore_errors=True)
+
+
+def _result(name: str, resolution: str, certs: int, seconds: float, spans: dict) -> dict:
+    return {
+        "benchmark": name,
+        "resolution": resolution,
+        "certificates": certs,
+        "seconds": round(seconds, 4),
+        "certs_per_second": round(certs / seconds, 2) if seconds else None,
+        "stages": spans,
+    }
+
+
+def bench_render(db, workshop: Workshop, resolution: str) -> dict:
+    """Time _render_certificate alone (template already resolved)."""
+    reset_certificates(db, workshop)
+    template = db.get(CertificateTemplate, workshop.active_template_id)
+    certs = db.query(Certificate).filter(Certificate.workshop_name == workshop.title).all()
+    spans = SpanRecorder()
+
+    start = time.perf_counter()
+    for cert in certs:
+        with spans.span("render"):
+            certificate_service._render_certificate(db, cert, template, spans)
+    elapsed = time.perf_counter() - start
+    return _result("render", resolution, len(certs), elapsed, spans.summary())
+
+
+def bench_workshop(db, workshop: Workshop, resolution: str) -> dict:
+    """Time generate_certificates_for_workshop end to end."""
+    reset_certificates(db, workshop)
+    start = time.perf_counter()
+    result = certificate_service.generate_certificates_for_workshop(db, workshop.id)
+    elapsed = time.perf_counter() - start
+    if result["failed"]:
+        print(f"  ! {result['failed']} certificates failed to render")
+    return _result("workshop", resolution, result["generated"], elapsed, result["timings"])
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_resolution(resolution: str, count: int, seed: int) -> dict:
+    """Run both benchmarks for one resolution in this (fresh) process."""
+    width, height = (int(v) for v in resolution.lower().split("x"))
+    # Keep rendered PNGs out of the real media directory
+    certificate_service.MEDIA_DIR = _work_dir / "media"
+    certificate_service.CERTIFICATES_DIR = _work_dir / "media" / "certificates"
+
+    init_db()
+    db = SessionLocal()
+    try:
+        workshop = setup_workshop(db, width, height, count, seed)
+        results = [bench(db, workshop, f"{width}x{height}") for bench in (bench_render, bench_workshop)]
+    finally:
+        db.close()
+        shutil.rmtree(MEDIA_DIR / BENCH_STORAGE_DIR, ignore_errors=True)
+        shutil.rmtree(_work_dir, ignore_errors=True)
+    return {"resolution": f"{width}x{height}", "peak_rss_mb": peak_rss_mb(), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help=f"Comma-separated WxH list (default {DEFAULT_RESOLUTIONS})")
+    parser.add_argument("--count", type=int, default=50, help="Certificates per resolution (default 50)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for templates and names (default 1)")
+    parser.add_argument("--out", type=Path, default=Path("benchmark-render.json"), help="Output JSON file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_resolution(args.resolutions, args.count, args.seed), ensure_ascii=False))
+        return
+    shutil.rmtree(_work_dir, ignore_errors=True)  # only workers use it
+
+    runs = []
+    for resolution in args.resolutions.split(","):
+        print(f"▶ {resolution}, {args.count} certificates")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", "--resolutions", resolution,
+             "--count", str(args.count), "--seed", str(args.seed)],
+            cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True, check=True,
+        )
+        *notes, last = proc.stdout.strip().splitlines()
+        for note in notes:
+            print(note)
+        run = json.loads(last)
+        runs.append(run)
+        for result in run["results"]:
+            print(f"  {result['benchmark']:<9} {result['certs_per_second']:>8} certs/s")
+        print(f"  peak RSS {run['peak_rss_mb']} MB (fresh process)")
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "platform": platform.platform(),
+        "count": args.count,
+        "seed": args.seed,
+        "runs": runs,
+    }
+    args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"✓ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
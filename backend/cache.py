@@ -0,0 +1,160 @@
+"""Bounded in-process LRU caches with per-entry TTL.
+
+Each process keeps its own copy, so writers invalidate the local entry and
+the TTL bounds how stale other workers can get.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from config import settings
+from metrics import Counter, Gauge
+
+_MISSING = object()
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+_caches: dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                result = "hit"
+                value = entry[1]
+            else:
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                result = "miss"
+                value = default
+        CACHE_REQUESTS.inc(cache=self.name, result=result)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def cache_stats() -> dict:
+    """Stats for every cache created in this process."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+Gauge(
+    "cache_entries",
+    "Entries currently held per cache",
+    ["cache"],
+    callback=lambda: {(name,): len(cache) for name, cache in _caches.items()},
+)
+
+Gauge(
+    "cache_hit_ratio",
+    "Hits / lookups per cache since process start",
+    ["cache"],
+    callback=lambda: {(name,): cache.stats()["hit_rate"] for name, cache in _caches.items()},
+)
+
+
+# ---------------------------------------------------------------------------
+# Application caches
+# ---------------------------------------------------------------------------
+
+# Public verify responses keyed by normalized (upper-case) certificate code
+verify_cache = TTLCache(
+    "verify",
+    maxsize=settings.VERIFY_CACHE_SIZE,
+    ttl=settings.VERIFY_CACHE_TTL_SECONDS,
+)
+
+# Template image URLs keyed by event id
+image_list_cache = TTLCache(
+    "event_images",
+    maxsize=settings.IMAGE_LIST_CACHE_SIZE,
+    ttl=settings.IMAGE_LIST_CACHE_TTL_SECONDS,
+)
+
+# Serialized template lists and active template ids keyed by event id
+template_list_cache = TTLCache(
+    "event_templates",
+    maxsize=settings.TEMPLATE_CACHE_SIZE,
+    ttl=settings.TEMPLATE_CACHE_TTL_SECONDS,
+)
+active_template_cache = TTLCache(
+    "active_template",
+    maxsize=settings.TEMPLATE_CACHE_SIZE,
+    ttl=settings.TEMPLATE_CACHE_TTL_SECONDS,
+)
+
+# (etag, last_modified, body) of external template images keyed by URL
+template_fetch_cache = TTLCache(
+    "template_fetch",
+    maxsize=settings.TEMPLATE_FETCH_CACHE_SIZE,
+    ttl=24 * 3600,
+)
+
+
+def normalize_code(code: str) -> str:
+    """Canonical form of a certificate code for cache keys and lookups."""
+    return code.strip().upper()
+
+
+def invalidate_certificate(code: str | None) -> None:
+    """Drop every cached view of a certificate after it changes."""
+    if code:
+        verify_cache.invalidate(normalize_code(code))
+
+
+def invalidate_event_templates(event_id: str) -> None:
+    """Drop cached templates of an event after one is saved or deleted."""
+    template_list_cache.invalidate(event_id)
+    active_template_cache.invalidate(event_id)
@@ -0,0 +1,201 @@
+"""Bloom filter of valid certificate codes.
+
+Public lookups by code (verify / download) consult the filter first: a
+definite miss is answered with 404 without touching the database, which
+shields it from scanners enumerating random codes.
+
+The filter is built at startup and kept current in three ways:
+
+* codes created in this process are added immediately;
+* every ``CODE_FILTER_REFRESH_SECONDS`` the next lookup pulls codes created
+  since the last refresh (covers inserts made by other worker processes);
+* deletions cannot be removed from a Bloom filter, so deleted codes simply
+  stay as false positives and fall through to the database. The filter is
+  rebuilt when it outgrows its capacity.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from config import settings
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Rows created this long before the last refresh are re-read, to catch
+# transactions that committed after a later row was already seen.
+_REFRESH_OVERLAP = timedelta(seconds=60)
+
+CODE_FILTER_LOOKUPS = Counter(
+    "code_filter_lookups_total",
+    "Code filter lookups by result (rejected = definite miss, passed = maybe present)",
+    ["result"],
+)
+CODE_FILTER_FALSE_POSITIVES = Counter(
+    "code_filter_false_positives_total",
+    "Lookups the filter passed that the database then did not find",
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def estimated_error_rate(self) -> float:
+        """Expected false-positive rate at the current fill level."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class CodeFilter:
+    """Process-wide set of known certificate codes backed by a Bloom filter."""
+
+    def __init__(self):
+        self._bloom: BloomFilter | None = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._watermark: datetime | None = None
+        self._last_refresh = 0.0
+        self.removed = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def build(self, session_factory) -> None:
+        """(Re)build the filter from every code in the database."""
+        from models import Certificate
+
+        start = time.perf_counter()
+        db = session_factory()
+        try:
+            total, watermark = db.query(
+                func.count(Certificate.id), func.max(Certificate.created_at)
+            ).one()
+            capacity = max(settings.CODE_FILTER_MIN_CAPACITY, int((total or 0) * 1.5))
+            bloom = BloomFilter(capacity, settings.CODE_FILTER_ERROR_RATE)
+            for (code,) in db.query(Certificate.code).yield_per(5000):
+                bloom.add(code.upper())
+        finally:
+            db.close()
+
+        with self._lock:
+            self._bloom = bloom
+            self._watermark = watermark
+            self._last_refresh = time.monotonic()
+            self.removed = 0
+        logger.info(
+            "Code filter built: %d codes, %d KiB, %.2fs",
+            bloom.count, len(bloom.bits) // 1024, time.perf_counter() - start,
+        )
+
+    def refresh(self, session_factory) -> None:
+        """Add codes created since the last build/refresh."""
+        from models import Certificate
+
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another thread is already refreshing
+        try:
+            self._last_refresh = time.monotonic()
+            db = session_factory()
+            try:
+                query = db.query(Certificate.code, Certificate.created_at)
+                if self._watermark is not None:
+                    query = query.filter(Certificate.created_at >= self._watermark - _REFRESH_OVERLAP)
+                rows = query.all()
+            finally:
+                db.close()
+            for code, created_at in rows:
+                self.add(code)
+                if created_at and (self._watermark is None or created_at > self._watermark):
+                    self._watermark = created_at
+            if self._bloom is not None and self._bloom.count > self._bloom.capacity:
+                self.build(session_factory)
+        except Exception:
+            logger.exception("Code filter refresh failed")
+        finally:
+            self._refresh_lock.release()
+
+    def add(self, code: str) -> None:
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(code.upper())
+
+    def note_removed(self) -> None:
+        """Record a deletion; the code remains a harmless false positive."""
+        self.removed += 1
+
+    def might_contain(self, code: str) -> bool:
+        """False only when the code definitely does not exist."""
+        bloom = self._bloom
+        if bloom is None:
+            return True
+        if time.monotonic() - self._last_refresh > settings.CODE_FILTER_REFRESH_SECONDS:
+            from database import SessionLocal
+            self.refresh(SessionLocal)
+            bloom = self._bloom
+        present = code.upper() in bloom
+        CODE_FILTER_LOOKUPS.inc(result="passed" if present else "rejected")
+        return present
+
+    def record_false_positive(self) -> None:
+        CODE_FILTER_FALSE_POSITIVES.inc()
+
+    def stats(self) -> dict:
+        bloom = self._bloom
+        if bloom is None:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "codes": bloom.count,
+            "capacity": bloom.capacity,
+            "removed_since_build": self.removed,
+            "memory_bytes": len(bloom.bits),
+            "hash_functions": bloom.num_hashes,
+            "target_error_rate": bloom.error_rate,
+            "estimated_error_rate": round(bloom.estimated_error_rate(), 6),
+            "rejected": CODE_FILTER_LOOKUPS.value(result="rejected"),
+            "passed": CODE_FILTER_LOOKUPS.value(result="passed"),
+            "false_positives": CODE_FILTER_FALSE_POSITIVES.value(),
+        }
+
+
+code_filter = CodeFilter()
+
+Gauge(
+    "code_filter_memory_bytes",
+    "Memory used by the certificate code Bloom filter",
+    callback=lambda: code_filter.stats().get("memory_bytes"),
+)
+Gauge(
+    "code_filter_estimated_error_rate",
+    "Estimated false-positive rate of the certificate code Bloom filter",
+    callback=lambda: code_filter.stats().get("estimated_error_rate"),
+)
@@ -1,11 +1,19 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Certificate, Workshop, Admin
-from schemas import CertificateCreate, WorkshopCreate
-from auth import hash_password, verify_password
+from sqlalchemy import func, and_, or_, case
+from models import Certificate, CertificateTemplate, Workshop, Admin
+from schemas import CertificateCreate, WorkshopCreate, CertificateResponse
+from auth import hash_password_bounded, verify_password, invalidate_admin_cache
+from cache import active_template_cache, invalidate_certificate, invalidate_event_templates, normalize_code
+from code_filter import code_filter
+import base64
 import uuid
 from datetime import datetime
 
+# Columns that may be requested through the ``fields`` parameter of the
+# admin listing. ``id`` and ``created_at`` are always selected because the
+# keyset cursor is built from them.
+CERTIFICATE_FIELDS = set(CertificateResponse.model_fields)
+
 
 # ============ Certificate CRUD ============
 
@@ -14,8 +22,8 @@ def create_certificate(db: Session, certificate_data: CertificateCreate) -> Cert
     # Generate unique code: ACM-YYYY-RANDOM if not provided
     if certificate_data.code:
         code = certificate_data.code
-        # Check for duplicate code
-        existing = db.query(Certificate).filter(Certificate.code == code).first()
+        # Check for duplicate code (codes are matched case-insensitively)
+        existing = get_certificate_by_code(db, code)
         if existing:
             raise ValueError(f"Certificate code '{code}' already exists")
     else:
@@ -39,12 +47,30 @@ def create_certificate(db: Session, certificate_data: CertificateCreate) -> Cert
     db.add(db_certificate)
     db.commit()
     db.refresh(db_certificate)
+    code_filter.add(db_certificate.code)
     return db_certificate
 
 
 def get_certificate_by_code(db: Session, code: str) -> Certificate | None:
-    """Get certificate by code"""
-    return db.query(Certificate).filter(Certificate.code == code).first()
+    """Get certificate by code (case-insensitive, uses ix_certificates_code_upper)"""
+    return (
+        db.query(Certificate)
+        .filter(func.upper(Certificate.code) == normalize_code(code))
+        .first()
+    )
+
+
+def get_certificates_by_codes(db: Session, codes: list[str]) -> dict[str, Certificate]:
+    """Get certificates for many codes with one IN query, keyed by normalized code"""
+    normalized = list({normalize_code(code) for code in codes})
+    if not normalized:
+        return {}
+    rows = (
+        db.query(Certificate)
+        .filter(func.upper(Certificate.code).in_(normalized))
+        .all()
+    )
+    return {normalize_code(cert.code): cert for cert in rows}
 
 
 def get_certificate_by_id(db: Session, certificate_id: str) -> Certificate | None:
@@ -57,9 +83,107 @@ def get_certificates(db: Session, skip: int = 0, limit: int = 100) -> list[Certi
     return db.query(Certificate).offset(skip).limit(limit).all()
 
 
-def get_certificates_by_email(db: Session, email: str) -> list[Certificate]:
-    """Get all certificates for an email"""
-    return db.query(Certificate).filter(Certificate.email == email).all()
+def encode_cursor(created_at: datetime, certificate_id: str) -> str:
+    """Build an opaque pagination cursor from a (created_at, id) pair"""
+    raw = f"{created_at.isoformat()}|{certificate_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, certificate_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), certificate_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_certificates_page(
+    db: Session,
+    limit: int = 100,
+    cursor: str | None = None,
+    skip: int = 0,
+    fields: list[str] | None = None,
+    workshop_name: str | None = None,
+    status: str | None = None,
+    email_status: str | None = None,
+) -> tuple[list, str | None]:
+    """Get one page of certificates, newest first, using keyset pagination.
+
+    Rows are ordered by (created_at, id) descending, which is served by the
+    ``ix_certificates_created_at_id`` index. When ``cursor`` is given the page
+    starts right after the row it encodes; ``skip`` is only honoured for
+    legacy offset-based callers without a cursor.
+
+    When ``fields`` is given only those columns are selected and rows are
+    returned as dicts instead of ORM objects.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if fields:
+        unknown = set(fields) - CERTIFICATE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        names = list(dict.fromkeys(["id", "created_at", *fields]))
+        query = db.query(*[getattr(Certificate, name) for name in names])
+    else:
+        names = None
+        query = db.query(Certificate)
+
+    if workshop_name is not None:
+        query = query.filter(Certificate.workshop_name == workshop_name)
+    if status is not None:
+        query = query.filter(Certificate.status == status)
+    if email_status is not None:
+        query = query.filter(Certificate.email_status == email_status)
+
+    if cursor:
+        created_at, certificate_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                Certificate.created_at < created_at,
+                and_(
+                    Certificate.created_at == created_at,
+                    Certificate.id < certificate_id,
+                ),
+            )
+        )
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = (
+        query.order_by(Certificate.created_at.desc(), Certificate.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    if names is not None:
+        rows = [dict(zip(names, row)) for row in rows]
+    return rows, next_cursor
+
+
+def get_certificates_by_email(
+    db: Session, email: str, skip: int = 0, limit: int = 100
+) -> list[Certificate]:
+    """Get certificates for an email, newest first (case-insensitive, uses ix_certificates_email_lower)"""
+    return (
+        db.query(Certificate)
+        .filter(func.lower(Certificate.email) == email.strip().lower())
+        .order_by(Certificate.created_at.desc(), Certificate.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 
 def update_certificate(db: Session, certificate_id: str, update_data: dict) -> Certificate | None:
@@ -74,6 +198,7 @@ def update_certificate(db: Session, certificate_id: str, update_data: dict) -> C
     
     db.commit()
     db.refresh(db_certificate)
+    invalidate_certificate(db_certificate.code)
     return db_certificate
 
 
@@ -83,8 +208,11 @@ def delete_certificate(db: Session, certificate_id: str) -> bool:
     if not db_certificate:
         return False
     
+    code = db_certificate.code
     db.delete(db_certificate)
     db.commit()
+    invalidate_certificate(code)
+    code_filter.note_removed()
     return True
 
 
@@ -93,6 +221,42 @@ def get_certificates_count(db: Session) -> int:
     return db.query(func.count(Certificate.id)).scalar()
 
 
+def _count_where(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END) helper for aggregates"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def get_certificate_stats(db: Session, workshop_name: str | None = None) -> list[dict]:
+    """Get per-workshop certificate counts in a single GROUP BY query.
+
+    Each row has workshop_name, total, generated, pending, sent and failed.
+    Memory use depends on the number of workshops, not certificates.
+    """
+    query = db.query(
+        Certificate.workshop_name,
+        func.count(Certificate.id),
+        _count_where(Certificate.status == "GENERATED"),
+        _count_where(Certificate.status == "PENDING"),
+        _count_where(Certificate.email_status == "SENT"),
+        _count_where(Certificate.email_status == "FAILED"),
+    )
+    if workshop_name is not None:
+        query = query.filter(Certificate.workshop_name == workshop_name)
+
+    rows = query.group_by(Certificate.workshop_name).order_by(Certificate.workshop_name).all()
+    return [
+        {
+            "workshop_name": name,
+            "total": total,
+            "generated": generated,
+            "pending": pending,
+            "sent": sent,
+            "failed": failed,
+        }
+        for name, total, generated, pending, sent, failed in rows
+    ]
+
+
 # ============ Workshop CRUD ============
 
 def create_workshop(db: Session, workshop_data: WorkshopCreate) -> Workshop:
@@ -144,14 +308,50 @@ def delete_workshop(db: Session, workshop_id: str) -> bool:
     
     db.delete(db_workshop)
     db.commit()
+    invalidate_event_templates(workshop_id)
     return True
 
 
+# ============ Template CRUD ============
+
+def get_latest_template(db: Session, workshop_id: str) -> CertificateTemplate | None:
+    """Most recently created template of a workshop"""
+    return (
+        db.query(CertificateTemplate)
+        .filter(CertificateTemplate.event_id == workshop_id)
+        .order_by(CertificateTemplate.created_at.desc())
+        .first()
+    )
+
+
+def get_active_template(db: Session, workshop: Workshop) -> CertificateTemplate | None:
+    """Template to render a workshop's certificates with.
+
+    The id is cached per workshop and loaded by primary key, so repeated
+    lookups in one session (bulk generation) hit the identity map.
+    """
+    template_id = active_template_cache.get(workshop.id)
+    if template_id is None:
+        template_id = workshop.active_template_id
+        if template_id is None:
+            latest = get_latest_template(db, workshop.id)
+            template_id = latest.id if latest else None
+        if template_id is None:
+            return None
+        active_template_cache.set(workshop.id, template_id)
+
+    template = db.get(CertificateTemplate, template_id)
+    if template is None or template.event_id != workshop.id:
+        active_template_cache.invalidate(workshop.id)
+        return get_latest_template(db, workshop.id)
+    return template
+
+
 # ============ Admin CRUD ============
 
 def create_admin(db: Session, email: str, password: str) -> Admin:
     """Create a new admin"""
-    hashed_password = hash_password(password)
+    hashed_password = hash_password_bounded(password)
     db_admin = Admin(
         email=email,
         hashed_password=hashed_password,
@@ -172,6 +372,19 @@ def get_admin_by_id(db: Session, admin_id: str) -> Admin | None:
     return db.query(Admin).filter(Admin.id == admin_id).first()
 
 
+def set_admin_active(db: Session, admin_id: str, is_active: bool) -> Admin | None:
+    """Activate or deactivate an admin and drop it from the auth cache"""
+    db_admin = get_admin_by_id(db, admin_id)
+    if not db_admin:
+        return None
+
+    db_admin.is_active = is_active
+    db.commit()
+    db.refresh(db_admin)
+    invalidate_admin_cache(db_admin.email)
+    return db_admin
+
+
 def authenticate_admin(db: Session, email: str, password: str) -> Admin | None:
     """Authenticate admin"""
     admin = get_admin_by_email(db, email)
@@ -1,19 +1,55 @@
 import logging
+import time
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
+from metrics import Gauge
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(
+
+def _create_engine(url: str, pool_size: int, max_overflow: int, pool_recycle: int):
+    """Create an engine with the configured pool settings."""
+    kwargs = {
+        "echo": settings.ENV == "development",
+        "pool_pre_ping": True,
+    }
+    # SQLite uses its own pool classes that don't take QueuePool sizing
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=pool_recycle,
+        )
+    return create_engine(url, **kwargs)
+
+
+engine = _create_engine(
     settings.DATABASE_URL,
-    echo=settings.ENV == "development",
-    pool_pre_ping=True,
+    settings.DB_POOL_SIZE,
+    settings.DB_MAX_OVERFLOW,
+    settings.DB_POOL_RECYCLE,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replica (optional). Public read-only routes use it through get_read_db.
+read_engine = None
+ReadSessionLocal = None
+if settings.DATABASE_READ_URL:
+    read_engine = _create_engine(
+        settings.DATABASE_READ_URL,
+        settings.DB_READ_POOL_SIZE,
+        settings.DB_READ_MAX_OVERFLOW,
+        settings.DB_READ_POOL_RECYCLE,
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Monotonic time until which the replica is skipped after a failure
+_replica_down_until = 0.0
+
 Base = declarative_base()
 
 
@@ -26,59 +62,222 @@ def get_db():
         db.close()
 
 
-def _column_exists(conn, table: str, column: str) -> bool:
-    """Check whether a column exists in a table."""
-    result = conn.execute(
-        text(
-            "SELECT column_name FROM information_schema.columns "
-            "WHERE table_name = :table AND column_name = :column"
+def open_read_session():
+    """Return a replica session, or a primary session if the replica is unavailable."""
+    global _replica_down_until
+    if ReadSessionLocal is None or time.monotonic() < _replica_down_until:
+        return SessionLocal()
+
+    db = ReadSessionLocal()
+    try:
+        # Check out a connection now so a dead replica is detected up front
+        db.connection()
+        return db
+    except OperationalError:
+        db.close()
+        _replica_down_until = time.monotonic() + settings.DB_READ_RETRY_SECONDS
+        logger.warning(
+            "Read replica unavailable, using primary for %ds",
+            settings.DB_READ_RETRY_SECONDS,
+        )
+        return SessionLocal()
+
+
+def get_read_db():
+    """Dependency for read-only routes; prefers the read replica when configured"""
+    db = open_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _pool_stats(eng) -> dict:
+    pool = eng.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status()}
+    for attr in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, attr, None)
+        if callable(fn):
+            stats[attr] = fn()
+    return stats
+
+
+def get_pool_stats() -> dict:
+    """Return connection pool usage for the primary and replica engines."""
+    return {
+        "primary": _pool_stats(engine),
+        "replica": _pool_stats(read_engine) if read_engine is not None else None,
+        "replica_fallback_active": (
+            read_engine is not None and time.monotonic() < _replica_down_until
         ),
-        {"table": table, "column": column},
-    )
-    return result.fetchone() is not None
+    }
 
 
-def upgrade_schema():
-    """Add any missing columns to existing tables (lightweight migration).
+def _pool_gauge_values() -> dict:
+    values = {}
+    for name, eng in (("primary", engine), ("replica", read_engine)):
+        if eng is None:
+            continue
+        stats = _pool_stats(eng)
+        for state in ("size", "checkedout", "checkedin", "overflow"):
+            if state in stats:
+                values[(name, state)] = stats[state]
+    return values
 
-    This keeps the live database in sync with the SQLAlchemy models without
-    requiring a full migration framework such as Alembic.
-    """
-    migrations = [
+
+Gauge(
+    "db_pool_connections",
+    "Connection pool usage by engine and state (size, checkedout, checkedin, overflow)",
+    ["engine", "state"],
+    callback=_pool_gauge_values,
+)
+
+
+# ---------------------------------------------------------------------------
+# Lightweight versioned migrations
+# ---------------------------------------------------------------------------
+# Each migration is (version, description, steps). Steps must be idempotent so
+# databases created before versioning existed (or by create_all) can replay
+# them safely. Append new migrations at the end; never renumber old ones.
+
+def _add_column(table: str, column: str, definition: str):
+    """Migration step: add a column if it is missing."""
+    def step(conn):
+        existing = {c["name"] for c in inspect(conn).get_columns(table)}
+        if column not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+            logger.info("Added column %s.%s", table, column)
+    return step
+
+
+def _postgres_only(sql: str):
+    """Migration step: run SQL on PostgreSQL only, tolerating missing privileges
+    or extensions that are not installed on the server."""
+    def step(conn):
+        if conn.dialect.name != "postgresql":
+            return
+        try:
+            with conn.begin_nested():
+                conn.execute(text(sql))
+        except (ProgrammingError, OperationalError):
+            logger.warning("Skipped PostgreSQL-only migration step: %s", sql)
+    return step
+
+
+def _execute(sql: str):
+    """Migration step: run a portable SQL statement (must be idempotent)."""
+    def step(conn):
+        conn.execute(text(sql))
+    return step
+
+
+def _create_index(name: str, table: str, columns: str):
+    """Migration step: create an index if it is missing."""
+    def step(conn):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    return step
+
+
+MIGRATIONS = [
+    (1, "generation status, template styling and email tracking", [
         # certificates table
-        ("certificates", "status", "ALTER TABLE certificates ADD COLUMN status VARCHAR NOT NULL DEFAULT 'PENDING'"),
-        ("certificates", "file_path", "ALTER TABLE certificates ADD COLUMN file_path VARCHAR"),
-        
+        _add_column("certificates", "status", "VARCHAR NOT NULL DEFAULT 'PENDING'"),
+        _add_column("certificates", "file_path", "VARCHAR"),
+
         # certificate_templates table
-        ("certificate_templates", "name_font_family", "ALTER TABLE certificate_templates ADD COLUMN name_font_family VARCHAR NOT NULL DEFAULT 'Arial'"),
-        ("certificate_templates", "name_alignment", "ALTER TABLE certificate_templates ADD COLUMN name_alignment VARCHAR NOT NULL DEFAULT 'center'"),
-        ("certificate_templates", "name_color", "ALTER TABLE certificate_templates ADD COLUMN name_color VARCHAR NOT NULL DEFAULT '#1a1a2e'"),
-        ("certificate_templates", "code_font_family", "ALTER TABLE certificate_templates ADD COLUMN code_font_family VARCHAR NOT NULL DEFAULT 'Courier New'"),
-        ("certificate_templates", "code_alignment", "ALTER TABLE certificate_templates ADD COLUMN code_alignment VARCHAR NOT NULL DEFAULT 'center'"),
-        ("certificate_templates", "code_color", "ALTER TABLE certificate_templates ADD COLUMN code_color VARCHAR NOT NULL DEFAULT '#333333'"),
-        
+        _add_column("certificate_templates", "name_font_family", "VARCHAR NOT NULL DEFAULT 'Arial'"),
+        _add_column("certificate_templates", "name_alignment", "VARCHAR NOT NULL DEFAULT 'center'"),
+        _add_column("certificate_templates", "name_color", "VARCHAR NOT NULL DEFAULT '#1a1a2e'"),
+        _add_column("certificate_templates", "code_font_family", "VARCHAR NOT NULL DEFAULT 'Courier New'"),
+        _add_column("certificate_templates", "code_alignment", "VARCHAR NOT NULL DEFAULT 'center'"),
+        _add_column("certificate_templates", "code_color", "VARCHAR NOT NULL DEFAULT '#333333'"),
+
         # certificates – email tracking
-        ("certificates", "email_status", "ALTER TABLE certificates ADD COLUMN email_status VARCHAR NOT NULL DEFAULT 'NOT_SENT'"),
-        ("certificates", "email_sent_at", "ALTER TABLE certificates ADD COLUMN email_sent_at TIMESTAMP"),
-        ("certificates", "email_error", "ALTER TABLE certificates ADD COLUMN email_error TEXT"),
-    ]
-
-    with engine.connect() as conn:
-        for table, column, ddl in migrations:
-            if not _column_exists(conn, table, column):
-                conn.execute(text(ddl))
-                logger.info("Added column %s.%s", table, column)
-
-        # Indexes (idempotent via IF NOT EXISTS)
+        _add_column("certificates", "email_status", "VARCHAR NOT NULL DEFAULT 'NOT_SENT'"),
+        _add_column("certificates", "email_sent_at", "TIMESTAMP"),
+        _add_column("certificates", "email_error", "TEXT"),
+        _create_index("ix_certificates_email_status", "certificates", "email_status"),
+    ]),
+    (2, "admin listing filter and keyset pagination indexes", [
+        _create_index("ix_certificates_status", "certificates", "status"),
+        _create_index("ix_certificates_workshop_name", "certificates", "workshop_name"),
+        _create_index("ix_certificates_created_at_id", "certificates", "created_at, id"),
+    ]),
+    (3, "case-insensitive code and email lookup indexes", [
+        _create_index("ix_certificates_code_upper", "certificates", "upper(code)"),
+        _create_index("ix_certificates_email_lower", "certificates", "lower(email)"),
+    ]),
+    (4, "trigram index for admin fuzzy search", [
+        # Expression must match services.search_service._search_expression
+        _postgres_only("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+        _postgres_only(
+            "CREATE INDEX IF NOT EXISTS ix_certificates_search_trgm ON certificates "
+            "USING gin (lower(recipient_name || ' ' || email || ' ' || code) gin_trgm_ops)"
+        ),
+    ]),
+    (5, "template image dimensions", [
+        _add_column("certificate_templates", "image_width", "INTEGER"),
+        _add_column("certificate_templates", "image_height", "INTEGER"),
+    ]),
+    (6, "active template pointer on workshops", [
+        _add_column("workshops", "active_template_id", "VARCHAR"),
+        # Point existing workshops at their newest template (the old rule)
+        _execute(
+            "UPDATE workshops SET active_template_id = ("
+            "SELECT t.id FROM certificate_templates t WHERE t.event_id = workshops.id "
+            "ORDER BY t.created_at DESC LIMIT 1"
+            ") WHERE active_template_id IS NULL"
+        ),
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version() -> int:
+    """Return the applied schema version (0 if the database is unversioned)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def upgrade_schema():
+    """Apply any pending migrations and record the new schema version.
+
+    This keeps the live database in sync with the SQLAlchemy models without
+    requiring a full migration framework such as Alembic. Works on both
+    PostgreSQL and SQLite.
+    """
+    with engine.begin() as conn:
         conn.execute(text(
-            "CREATE INDEX IF NOT EXISTS ix_certificates_email_status "
-            "ON certificates (email_status)"
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
         ))
+        current = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
 
-        conn.commit()
+        for version, description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            for step in steps:
+                step(conn)
+            logger.info("Applied migration %d: %s", version, description)
+
+        if current < SCHEMA_VERSION:
+            conn.execute(text("DELETE FROM schema_version"))
+            conn.execute(
+                text("INSERT INTO schema_version (version) VALUES (:version)"),
+                {"version": SCHEMA_VERSION},
+            )
 
 
 def init_db():
-    """Initialize database tables and run lightweight migrations."""
+    """Initialize database tables and run lightweight migrations.
+
+    When the database is already at SCHEMA_VERSION this costs a single query.
+    """
+    if get_schema_version() >= SCHEMA_VERSION:
+        return
+    import models  # noqa: F401  (registers tables on Base.metadata)
     Base.metadata.create_all(bind=engine)
     upgrade_schema()
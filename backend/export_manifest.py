@@ -0,0 +1,47 @@
+"""
+Export a signed static verification manifest
+Run: python export_manifest.py <out_dir>            (full export)
+     python export_manifest.py <out_dir> --delta    (changes since last export)
+     python export_manifest.py <out_dir> --rotate-salt  (full export with a new key salt)
+Requires CERT_SIGNING_PRIVATE_KEY (generate one with: python signing.py)
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from database import init_db, SessionLocal
+from services.manifest_service import export_delta, export_full_manifest, latest_watermark, manifest_salt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir", type=Path, help="Directory to write the manifest into")
+    parser.add_argument("--delta", action="store_true", help="Only export changes since the last export")
+    parser.add_argument("--since", help="ISO timestamp to export changes after (implies --delta)")
+    parser.add_argument("--prefix-length", type=int, default=2, help="Hex digits per shard name (default 2 = 256 shards)")
+    parser.add_argument("--rotate-salt", action="store_true", help="Derive entry keys with a new salt (full export only)")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.delta or args.since:
+            since = datetime.fromisoformat(args.since) if args.since else latest_watermark(args.out_dir)
+            if since is None or manifest_salt(args.out_dir) is None:
+                print("✗ No previous full export found; run a full export first")
+                return
+            delta = export_delta(db, args.out_dir, since)
+            if delta is None:
+                print(f"✓ No changes since {since.isoformat()}")
+            else:
+                print(f"✓ Exported delta: {len(delta['upserts'])} upserts, {len(delta['revoked'])} revoked")
+        else:
+            manifest = export_full_manifest(db, args.out_dir, args.prefix_length, args.rotate_salt)
+            print(f"✓ Exported {manifest['count']} certificates in {len(manifest['shards'])} shards to {args.out_dir}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""HTTP conditional-request helpers (ETag / If-None-Match / Cache-Control)."""
+import hashlib
+
+from fastapi import Request, Response
+from fastapi.staticfiles import StaticFiles
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the given state parts."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for an exact response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match matches etag (weak comparison, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == target
+        for tag in header.split(",")
+    )
+
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds a Cache-Control header to every file response.
+
+    Starlette already emits ETag / Last-Modified and answers If-None-Match
+    with 304; this only adds the caching policy. ``path_cache_control`` maps
+    path prefixes to their own policy, for files rewritten in place at the
+    same URL.
+    """
+
+    def __init__(
+        self,
+        *args,
+        cache_control: str = "",
+        path_cache_control: dict[str, str] | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+        self.path_cache_control = path_cache_control or {}
+
+    def policy_for(self, path: str) -> str:
+        path = path.replace("\\", "/").lstrip("/")
+        for prefix, policy in self.path_cache_control.items():
+            if path.startswith(prefix):
+                return policy
+        return self.cache_control
+
+    async def get_response(self, path: str, scope) -> Response:
+        response = await super().get_response(path, scope)
+        # Also set on 304s so revalidated copies keep the same policy
+        cache_control = self.policy_for(path)
+        if cache_control and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = cache_control
+        return response
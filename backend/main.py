@@ -1,12 +1,22 @@
+import secrets
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
 from config import settings
-from database import init_db
+from database import init_db, get_db, get_pool_stats, SessionLocal
+from code_filter import code_filter
+from auth import get_current_admin, password_pool_stats, security
+from cache import cache_stats
+from http_cache import CachedStaticFiles
+from ratelimit import RateLimitMiddleware
+from profiler import ProfilerBusy, SamplingProfiler
+from storage import close_http_client, open_http_client
+import metrics
 from routers import auth, certificates, workshops, images, templates
 
 # Initialize database on startup
@@ -15,12 +25,17 @@ async def lifespan(app: FastAPI):
     # Startup
     init_db()
     print("✓ Database initialized")
+    if settings.CODE_FILTER_ENABLED:
+        code_filter.build(SessionLocal)
+        print("✓ Certificate code filter built")
     # Ensure media directories exist
     media_dir = Path(__file__).parent / "media" / "certificates"
     media_dir.mkdir(parents=True, exist_ok=True)
     print("✓ Media directories ready")
+    open_http_client()
     yield
     # Shutdown
+    close_http_client()
     print("✓ Application shutdown")
 
 
@@ -32,6 +47,9 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Rate limiting for public routes (inside CORS so 429s carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,8 +57,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After"],
 )
 
+# Request counts and latency per route (outermost, so it sees every response)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(certificates.router)
@@ -51,7 +74,15 @@ app.include_router(templates.router)
 # Serve generated certificate images
 _media_dir = Path(__file__).parent / "media"
 _media_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/media", StaticFiles(directory=str(_media_dir)), name="media")
+app.mount(
+    "/media",
+    CachedStaticFiles(
+        directory=str(_media_dir),
+        cache_control=settings.MEDIA_CACHE_CONTROL,
+        path_cache_control={"certificates/": settings.MEDIA_CERTIFICATES_CACHE_CONTROL},
+    ),
+    name="media",
+)
 
 
 # Health check endpoint
@@ -61,6 +92,73 @@ def health_check():
     return {"status": "healthy", "app": settings.APP_NAME}
 
 
+@app.get("/health/db-pool")
+def db_pool_stats(current_admin=Depends(get_current_admin)):
+    """Connection pool usage for the primary and read replica (admin only)"""
+    return get_pool_stats()
+
+
+@app.get("/health/password-pool")
+def password_pool(current_admin=Depends(get_current_admin)):
+    """Password hashing pool usage and login throttling counts (admin only)"""
+    return password_pool_stats()
+
+
+@app.get("/health/caches")
+def caches_stats(current_admin=Depends(get_current_admin)):
+    """Size and hit rate of the in-process caches (admin only)"""
+    return cache_stats()
+
+
+@app.get("/health/code-filter")
+def code_filter_stats(current_admin=Depends(get_current_admin)):
+    """Memory and false-positive rate of the certificate code filter (admin only)"""
+    return code_filter.stats()
+
+
+def metrics_access(credentials=Depends(security), db=Depends(get_db)) -> None:
+    """Allow scrapers holding METRICS_TOKEN, otherwise require an admin"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and secrets.compare_digest(
+        credentials.credentials.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        return
+    get_current_admin(credentials, db)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint(access=Depends(metrics_access)):
+    """Prometheus-format metrics (METRICS_TOKEN bearer or admin only)"""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.post("/debug/profile", response_class=PlainTextResponse, include_in_schema=False)
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|top)$"),
+    include_idle: bool = Query(False, description="Keep samples of parked threads"),
+    current_admin=Depends(get_current_admin),
+):
+    """Sample all threads for a bounded window and return the profile (admin only).
+
+    Start it, then drive the slow workload (e.g. generate-workshop) while it runs.
+    ``collapsed`` output loads directly into speedscope or flamegraph.pl.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    profiler = SamplingProfiler(interval=interval_ms / 1000, include_idle=include_idle)
+    try:
+        await run_in_threadpool(profiler.run, seconds)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    body = profiler.collapsed() if format == "collapsed" else profiler.top()
+    return PlainTextResponse(body)
+
+
 @app.get("/")
 def root():
     """Root endpoint"""
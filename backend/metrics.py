@@ -0,0 +1,276 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock,
+so recording a sample costs a dict lookup and an addition. ``render()``
+produces the Prometheus text format for the ``/metrics`` endpoint.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+from starlette.routing import Mount
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_registry: list["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, optionally split by labels."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Point-in-time value. Pass ``callback`` to read it lazily at scrape time.
+
+    A callback returns either a number or a mapping of label-value tuples to
+    numbers.
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        callback: Callable[[], float | dict] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list[str]:
+        if self._callback is not None:
+            try:
+                result = self._callback()
+            except Exception:
+                return []
+            items = result.items() if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in items
+            if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values (usually seconds)."""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> tuple[int, float]:
+        """Return (count, sum) for one label set."""
+        with self._lock:
+            row = self._values.get(self._key(labels))
+            if row is None:
+                return 0, 0.0
+            return int(sum(row[:-1])), row[-1]
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        lines = []
+        for key, row in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), row[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} "
+                    f"{_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+        return lines
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# HTTP request metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template",
+    ["method", "route"],
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+)
+
+
+def _route_label(scope) -> str:
+    """Route template (e.g. /api/certificates/verify/{code}) to keep labels bounded."""
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if path:
+        return path
+    # Rejected by RateLimitMiddleware before routing ran
+    rule = scope.get("rate_limit_rule")
+    if rule:
+        return f"rate_limit:{rule}"
+    # Mounted apps (e.g. /media static files) don't record their route
+    for candidate in getattr(scope.get("app"), "routes", ()):
+        if isinstance(candidate, Mount) and scope["path"].startswith(candidate.path + "/"):
+            return candidate.path + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count and latency of every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            method, route = scope["method"], _route_label(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status_code)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, Boolean, Table, JSON, Float
+from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, Boolean, Table, JSON, Float, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -23,6 +23,9 @@ class Workshop(Base):
     level = Column(String, nullable=False, default="Beginner")  # Beginner, Intermediate, Advanced
     instructor = Column(String, nullable=False)
     image = Column(String, nullable=True)
+    # Template used for rendering; kept in sync by the template routes rather
+    # than a foreign key, which would make workshops and templates circular
+    active_template_id = Column(String, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -48,7 +51,7 @@ class Certificate(Base):
     
     recipient_name = Column(String, nullable=False)
     email = Column(String, nullable=False, index=True)
-    workshop_name = Column(String, nullable=False)
+    workshop_name = Column(String, nullable=False, index=True)
     issue_date = Column(String, nullable=False)
     skills = Column(JSON, default=list)  # List of skills
     instructor = Column(String, nullable=False)
@@ -57,7 +60,7 @@ class Certificate(Base):
     verification_code = Column(String, unique=True, nullable=False, index=True)
     
     # Generation status
-    status = Column(String, nullable=False, default="PENDING")  # PENDING | GENERATED
+    status = Column(String, nullable=False, default="PENDING", index=True)  # PENDING | GENERATED
     file_path = Column(String, nullable=True)  # relative path e.g. certificates/ACM-2024-ABCD.png
     
     # Email delivery tracking
@@ -75,6 +78,14 @@ class Certificate(Base):
         back_populates="certificates"
     )
 
+    __table_args__ = (
+        # Keyset pagination order for the admin listing (migration 2)
+        Index("ix_certificates_created_at_id", "created_at", "id"),
+        # Case-insensitive code and email lookups (migration 3)
+        Index("ix_certificates_code_upper", func.upper(code)),
+        Index("ix_certificates_email_lower", func.lower(email)),
+    )
+
     def __repr__(self):
         return f"<Certificate(id={self.id}, code={self.code})>"
 
@@ -100,6 +111,8 @@ class CertificateTemplate(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     event_id = Column(String, ForeignKey("workshops.id"), nullable=False, index=True)
     image_url = Column(String, nullable=False)
+    image_width = Column(Integer, nullable=True)  # pixels, recorded at save time
+    image_height = Column(Integer, nullable=True)
 
     # Name placeholder position (percentage 0-100 and font size in px)
     name_x = Column(Float, nullable=False, default=50)
@@ -0,0 +1,99 @@
+"""On-demand sampling profiler.
+
+A background thread snapshots every thread's stack with
+``sys._current_frames()`` at a fixed interval for a bounded window. The
+result is returned as collapsed stacks ("frame;frame;frame count" lines,
+the input format of flamegraph.pl and speedscope) or as a flat table of
+the hottest functions. Only one profile runs at a time.
+"""
+import sys
+import threading
+import time
+from collections import Counter as CounterDict
+from pathlib import Path
+
+# Leaf frames that mean a thread is parked rather than doing work
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py", "base_events.py")
+_IDLE_FUNCTIONS = {"wait", "get", "select", "poll", "_worker", "_run_once", "acquire"}
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already running."""
+
+
+_running = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{Path(code.co_filename).stem}:{name}"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return code.co_name in _IDLE_FUNCTIONS and code.co_filename.endswith(_IDLE_FILES)
+
+
+class SamplingProfiler:
+    """Collects stack samples of all threads except its own."""
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: CounterDict[str] = CounterDict()
+        self.samples = 0
+        self.duration = 0.0
+
+    def run(self, seconds: float) -> "SamplingProfiler":
+        """Sample for ``seconds`` on the calling thread."""
+        if not _running.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            own = threading.get_ident()
+            names = {}
+            start = time.perf_counter()
+            deadline = start + seconds
+            while time.perf_counter() < deadline:
+                frames = sys._current_frames()
+                if len(names) != len(frames):
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == own or (not self.include_idle and _is_idle(frame)):
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+            self.duration = time.perf_counter() - start
+        finally:
+            _running.release()
+        return self
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "a;b;c count" line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, limit: int = 50) -> str:
+        """Flat table of functions by self and total (inclusive) samples."""
+        own: CounterDict[str] = CounterDict()
+        total: CounterDict[str] = CounterDict()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # drop the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+
+        lines = [
+            f"# {self.samples} samples over {self.duration:.1f}s "
+            f"(interval {self.interval * 1000:.1f} ms)",
+            f"{'self':>8} {'total':>8}  function",
+        ]
+        for frame, count in total.most_common(limit):
+            lines.append(f"{own[frame]:>8} {count:>8}  {frame}")
+        return "\n".join(lines) + "\n"
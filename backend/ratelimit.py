@@ -0,0 +1,272 @@
+"""Token-bucket rate limiting for public endpoints.
+
+Each rule matches a method and path pattern and gives every client IP its own
+bucket of ``burst`` tokens refilled at ``rate`` tokens per second. Buckets
+live in process memory by default; set ``RATE_LIMIT_REDIS_URL`` to share them
+between workers (requires the ``redis`` package).
+"""
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the rate limiter",
+    ["rule"],
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    methods: frozenset[str]
+    pattern: re.Pattern
+    rate: float  # tokens per second
+    burst: int
+
+
+def parse_limit(limit: str) -> tuple[float, int]:
+    """Parse '60/minute' into (tokens per second, burst size)."""
+    count, _, period = limit.partition("/")
+    seconds = _PERIODS.get(period.strip().rstrip("s"), None)
+    if seconds is None:
+        raise ValueError(f"Invalid rate limit '{limit}'")
+    burst = int(count)
+    return burst / seconds, burst
+
+
+# Route groups and the paths they cover; budgets come from settings.RATE_LIMITS
+_ROUTE_PATTERNS = {
+    "verify": ({"GET", "POST"}, r"^/api/certificates/verify"),
+    "search": ({"GET"}, r"^/api/certificates/search$"),
+    "download": ({"GET"}, r"^/api/certificates/download/"),
+    "images": ({"GET"}, r"^/api/events/[^/]+/images$"),
+}
+
+
+def build_rules() -> list[Rule]:
+    rules = []
+    for name, limit in settings.RATE_LIMITS.items():
+        if name not in _ROUTE_PATTERNS:
+            logger.warning("Unknown rate limit group '%s' ignored", name)
+            continue
+        methods, pattern = _ROUTE_PATTERNS[name]
+        rate, burst = parse_limit(limit)
+        rules.append(Rule(name, frozenset(methods), re.compile(pattern), rate, burst))
+    return rules
+
+
+_rules: list[Rule] | None = None
+
+
+def get_rules() -> list[Rule]:
+    """Rules built from settings once per process."""
+    global _rules
+    if _rules is None:
+        _rules = build_rules()
+    return _rules
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class MemoryBackend:
+    """Per-process token buckets in a bounded LRU map."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets: "OrderedDict[str, list[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1) -> float:
+        """Consume ``cost`` tokens; return 0 if allowed, else seconds until one is free.
+
+        A request is allowed while at least one token is left and may drive
+        the bucket negative, so costs above ``burst`` are repaid over time.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(burst), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self._max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= cost
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+
+class RedisBackend:
+    """Token buckets shared between processes through Redis."""
+
+    # take() is a network round-trip; the middleware runs it in a thread
+    blocking = True
+
+    _SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[2])
+    local ts = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[3])
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - cost else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self._SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1) -> float:
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time(), cost]))
+
+
+def _create_backend():
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryBackend()
+
+
+_shared_backend = None
+
+
+def get_backend():
+    """Backend shared by the middleware and handlers that call charge()."""
+    global _shared_backend
+    if _shared_backend is None:
+        _shared_backend = _create_backend()
+    return _shared_backend
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+def client_ip(scope_or_request) -> str:
+    """Client IP, read from X-Forwarded-For when TRUSTED_PROXY_HOPS is set.
+
+    Each proxy appends the address it received the request from, so only the
+    last TRUSTED_PROXY_HOPS entries were written by our own proxies; anything
+    to their left is client-supplied and cannot be trusted.
+    """
+    scope = getattr(scope_or_request, "scope", scope_or_request)
+    hops = settings.TRUSTED_PROXY_HOPS
+    if hops > 0:
+        forwarded = [
+            host.strip()
+            for name, value in scope.get("headers", [])
+            if name == b"x-forwarded-for"
+            for host in value.decode("latin-1").split(",")
+        ]
+        forwarded = [host for host in forwarded if host]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware returning 429 with Retry-After when a bucket is empty."""
+
+    def __init__(self, app, backend=None, rules: list[Rule] | None = None):
+        self.app = app
+        self.rules = get_rules() if rules is None else rules
+        self.backend = backend or get_backend()
+
+    def _match(self, method: str, path: str) -> Rule | None:
+        for rule in self.rules:
+            if method in rule.methods and rule.pattern.match(path):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope["method"], scope["path"])
+        if rule is not None:
+            try:
+                key = f"{rule.name}:{client_ip(scope)}"
+                if self.backend.blocking:
+                    wait = await run_in_threadpool(self.backend.take, key, rule.rate, rule.burst)
+                else:
+                    wait = self.backend.take(key, rule.rate, rule.burst)
+            except Exception:
+                # Never fail requests because the shared backend is down
+                logger.exception("Rate limit backend error")
+                wait = 0.0
+            if wait > 0:
+                RATE_LIMITED.inc(rule=rule.name)
+                # Routing never runs, so tell MetricsMiddleware what matched
+                scope["rate_limit_rule"] = rule.name
+                await self._reject(send, wait)
+                return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, wait: float) -> None:
+        body = json.dumps({"detail": "Too many requests"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def charge(request, group: str, tokens: int) -> float:
+    """Take ``tokens`` more from the caller's bucket for route group ``group``.
+
+    The middleware charges one token per request before the body is read;
+    handlers whose cost depends on the body (batch verification) call this
+    for the rest. Returns 0 if allowed, else seconds until a retry may pass.
+    May block on the shared backend, so call it from sync (threadpool) handlers.
+    """
+    if tokens <= 0 or not settings.RATE_LIMIT_ENABLED:
+        return 0.0
+    rule = next((r for r in get_rules() if r.name == group), None)
+    if rule is None:
+        return 0.0
+    try:
+        wait = get_backend().take(f"{rule.name}:{client_ip(request)}", rule.rate, rule.burst, cost=tokens)
+    except Exception:
+        logger.exception("Rate limit backend error")
+        return 0.0
+    if wait > 0:
+        RATE_LIMITED.inc(rule=rule.name)
+    return wait
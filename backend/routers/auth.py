@@ -1,16 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
 from database import get_db
 from schemas import AdminLogin, AdminCreate, TokenResponse, AdminResponse
-from auth import create_access_token, authenticate_admin, hash_password
-from crud import create_admin, get_admin_by_email
+from auth import (
+    create_access_token,
+    get_current_admin,
+    verify_password_async,
+    PasswordPoolBusy,
+    login_retry_after,
+    record_login_failure,
+    reset_login_failures,
+)
+from crud import create_admin, get_admin_by_email, set_admin_active
 from config import settings
+from models import Admin
+from ratelimit import client_ip
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
+def _pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=AdminResponse)
 def register(admin_data: AdminCreate, db: Session = Depends(get_db)):
     """Register a new admin (only allowed for initial setup)"""
@@ -22,19 +41,48 @@ def register(admin_data: AdminCreate, db: Session = Depends(get_db)):
             detail="Email already registered",
         )
     
-    new_admin = create_admin(db, admin_data.email, admin_data.password)
+    try:
+        new_admin = create_admin(db, admin_data.email, admin_data.password)
+    except PasswordPoolBusy:
+        raise _pool_busy()
     return new_admin
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(credentials: AdminLogin, db: Session = Depends(get_db)):
-    """Login admin and get access token"""
-    admin = authenticate_admin(db, credentials.email, credentials.password)
-    if not admin:
+async def login(
+    credentials: AdminLogin,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Login admin and get access token.
+
+    bcrypt runs on the bounded password pool; repeated failures from one IP
+    (or from one IP against one email) are throttled with 429.
+    """
+    ip = client_ip(request)
+    retry_after = login_retry_after(ip, credentials.email)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    admin = await run_in_threadpool(get_admin_by_email, db, credentials.email)
+    try:
+        valid = admin is not None and await verify_password_async(
+            credentials.password, admin.hashed_password
+        )
+    except PasswordPoolBusy:
+        raise _pool_busy()
+
+    if not valid or not admin.is_active:
+        record_login_failure(ip, credentials.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
+    reset_login_failures(ip, credentials.email)
     
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -60,9 +108,33 @@ def init_admin(db: Session = Depends(get_db)):
             detail="Admin already initialized",
         )
     
-    admin = create_admin(db, settings.ADMIN_EMAIL, settings.ADMIN_PASSWORD)
+    try:
+        admin = create_admin(db, settings.ADMIN_EMAIL, settings.ADMIN_PASSWORD)
+    except PasswordPoolBusy:
+        raise _pool_busy()
     return {
         "success": True,
         "message": "Admin initialized successfully",
         "admin": AdminResponse.from_orm(admin),
     }
+
+
+@router.post("/admins/{admin_id}/deactivate", response_model=AdminResponse)
+def deactivate_admin(
+    admin_id: str,
+    current_admin: Admin = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Deactivate an admin; their tokens stop working immediately (admin only)"""
+    if admin_id == current_admin.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You cannot deactivate your own account",
+        )
+    admin = set_admin_active(db, admin_id, False)
+    if not admin:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Admin not found",
+        )
+    return admin
@@ -1,37 +1,61 @@
+import csv
+import io
 import logging
+import math
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request, Response, UploadFile, File
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
-from database import get_db, SessionLocal
+from database import get_db, get_read_db, open_read_session, SessionLocal
 from models import Admin, Certificate, Workshop
 from schemas import (
     CertificateCreate,
     CertificateResponse,
+    CertificatePartialResponse,
+    CertificateSearchResult,
+    BatchVerifyRequest,
+    BatchVerifyResponse,
+    SignedVerifyResponse,
     CertificateVerifyResponse,
     CertificateUpdate,
     BulkGenerateResponse,
     EmailStatusResponse,
     BulkEmailResponse,
+    CertificateStatsResponse,
 )
 from auth import get_current_admin
+from cache import verify_cache, normalize_code
+from code_filter import code_filter
+from config import settings
+from http_cache import body_etag, is_not_modified, make_etag, not_modified_response
+from metrics import Gauge
+from ratelimit import charge
+from signing import (
+    InvalidToken,
+    SigningNotConfigured,
+    name_hash,
+    public_key_b64,
+    verify_token,
+)
 from crud import (
     create_certificate,
     get_certificate_by_code,
+    get_certificates_by_codes,
     get_certificate_by_id,
-    get_certificates,
+    get_certificates_page,
     get_certificates_by_email,
     update_certificate,
     delete_certificate,
-    get_certificates_count,
+    get_certificate_stats,
 )
 from services.certificate_service import (
     generate_single_certificate,
     generate_certificates_for_workshop,
     MEDIA_DIR,
 )
+from services.search_service import search_certificates_fuzzy
 from services.zip_service import create_certificates_zip
 from services.email_service import send_certificate_email, send_bulk_certificate_emails
 
@@ -43,13 +67,46 @@ router = APIRouter(prefix="/api/certificates", tags=["certificates"])
 # ============ Public Routes ============
 
 @router.get("/verify/{code}", response_model=CertificateVerifyResponse)
-def verify_certificate(code: str, db: Session = Depends(get_db)):
+def verify_certificate(
+    code: str,
+    request: Request,
+    db: Session = Depends(get_db),
+):
     """
     Verify a certificate by code (public endpoint)
-    Returns only public information
-    """
-    certificate = get_certificate_by_code(db, code.upper())
+    Returns only public information. Responses are cached per code and
+    carry an ETag, so repeat checks can be answered with 304. Misses read
+    the primary: a lagging replica read would be cached for
+    VERIFY_CACHE_TTL_SECONDS after an update invalidated the entry.
+    """
+    cache_key = normalize_code(code)
+    cached = verify_cache.get(cache_key)
+    if cached is None:
+        cached = _build_verify_response(db, code)
+        verify_cache.set(cache_key, cached)
+
+    body, etag = cached
+    cache_control = settings.VERIFY_CACHE_CONTROL
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, cache_control)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+def _build_verify_response(db: Session, code: str) -> tuple[bytes, str]:
+    """Look up a certificate and return its serialized public view and ETag."""
+    if not code_filter.might_contain(normalize_code(code)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Certificate not found",
+        )
+
+    certificate = get_certificate_by_code(db, code)
     if not certificate:
+        code_filter.record_false_positive()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Certificate not found",
@@ -61,6 +118,12 @@ def verify_certificate(code: str, db: Session = Depends(get_db)):
             detail="Certificate is not valid",
         )
     
+    body = _to_verify_response(certificate).model_dump_json().encode("utf-8")
+    return body, body_etag(body)
+
+
+def _to_verify_response(certificate: Certificate) -> CertificateVerifyResponse:
+    """Public view of a certificate"""
     # Build certificate_url if file exists
     cert_url = None
     if certificate.file_path:
@@ -81,16 +144,196 @@ def verify_certificate(code: str, db: Session = Depends(get_db)):
     )
 
 
+def _verify_many(db: Session, codes: list[str]) -> dict[str, CertificateVerifyResponse | None]:
+    """Verify codes with one IN query; result keys are the codes as given"""
+    candidates = [c for c in codes if code_filter.might_contain(normalize_code(c))]
+    found = get_certificates_by_codes(db, candidates)
+    results = {}
+    for code in codes:
+        cert = found.get(normalize_code(code))
+        results[code] = _to_verify_response(cert) if cert and cert.is_verified else None
+    return results
+
+
+@router.post("/verify/batch", response_model=BatchVerifyResponse)
+def verify_certificates_batch(
+    data: BatchVerifyRequest,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Verify up to VERIFY_BATCH_MAX_CODES certificates at once (public endpoint).
+    Codes that are not found or not valid map to null.
+    """
+    codes = list(dict.fromkeys(c.strip() for c in data.codes if c.strip()))
+    if len(codes) > settings.VERIFY_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.VERIFY_BATCH_MAX_CODES} codes per request",
+        )
+    results = _verify_many(db, codes)
+    found = sum(1 for r in results.values() if r is not None)
+    return BatchVerifyResponse(results=results, found=found, not_found=len(results) - found)
+
+
+_BATCH_CSV_COLUMNS = [
+    "code", "valid", "recipient_name", "workshop_name",
+    "issue_date", "instructor", "certificate_url",
+]
+
+
+# Tried in order; spreadsheet exports on Windows are often cp1252
+_CSV_ENCODINGS = ("utf-8-sig", "cp1252")
+
+
+def _read_codes_csv(file: UploadFile) -> list[str]:
+    """Read codes from a CSV upload: the 'code' column, else the first column."""
+    for encoding in _CSV_ENCODINGS:
+        file.file.seek(0)
+        text = io.TextIOWrapper(file.file, encoding=encoding, newline="")
+        try:
+            return _parse_codes_csv(text)
+        except UnicodeDecodeError:
+            continue
+        finally:
+            # Keep the wrapper from closing the upload when it is collected
+            text.detach()
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="CSV must be UTF-8 or Windows-1252 encoded",
+    )
+
+
+def _parse_codes_csv(text: io.TextIOBase) -> list[str]:
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return []
+    lowered = [h.strip().lower() for h in header]
+    if "code" in lowered:
+        index = lowered.index("code")
+        codes = []
+    else:
+        # No header row: the first line is already data
+        index = 0
+        codes = [header[0].strip()] if header and header[0].strip() else []
+
+    for row in reader:
+        if len(row) > index and row[index].strip():
+            codes.append(row[index].strip())
+        if len(codes) > settings.VERIFY_BATCH_CSV_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {settings.VERIFY_BATCH_CSV_MAX_ROWS} codes per file",
+            )
+    return codes
+
+
+def _stream_batch_csv(codes: list[str]):
+    """Yield CSV result rows, one IN query per VERIFY_BATCH_MAX_CODES codes."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(_BATCH_CSV_COLUMNS)
+
+    db = open_read_session()
+    try:
+        step = settings.VERIFY_BATCH_MAX_CODES
+        for start in range(0, len(codes), step):
+            for code, result in _verify_many(db, codes[start:start + step]).items():
+                if result is None:
+                    writer.writerow([code, "false", "", "", "", "", ""])
+                else:
+                    writer.writerow([
+                        code, "true", result.recipient_name, result.workshop_name,
+                        result.issue_date, result.instructor, result.certificate_url or "",
+                    ])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+@router.post("/verify/batch/csv")
+def verify_certificates_batch_csv(request: Request, file: UploadFile = File(...)):
+    """
+    Verify every code in an uploaded CSV (public endpoint).
+    Results are streamed back as CSV in chunks. Each chunk of
+    VERIFY_BATCH_MAX_CODES codes costs one verify rate-limit token.
+    """
+    codes = _read_codes_csv(file)
+    # The middleware already charged one token for the first chunk
+    chunks = math.ceil(len(codes) / settings.VERIFY_BATCH_MAX_CODES)
+    wait = charge(request, "verify", chunks - 1)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+    return StreamingResponse(
+        _stream_batch_csv(codes),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=verification-results.csv"},
+    )
+
+
+@router.get("/verify-signed", response_model=SignedVerifyResponse)
+def verify_signed_certificate(
+    t: str = Query(..., description="Signed token from the certificate QR code"),
+    name: str | None = Query(None, description="Recipient name to match against the token"),
+):
+    """
+    Verify a signed QR token offline (public endpoint).
+    Only checks the Ed25519 signature; no database access.
+    """
+    try:
+        fields = verify_token(t)
+    except SigningNotConfigured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Signed verification is not configured",
+        )
+    except InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Certificate is not valid",
+        )
+    return SignedVerifyResponse(
+        valid=True,
+        code=fields["code"],
+        workshop_name=fields["workshop_name"],
+        issue_date=fields["issue_date"],
+        name_matches=(name_hash(name) == fields["name_hash"]) if name else None,
+    )
+
+
+@router.get("/signing-key")
+def get_signing_key():
+    """
+    Ed25519 public key for verifying QR tokens client-side (public endpoint)
+    """
+    try:
+        return {"algorithm": "Ed25519", "public_key": public_key_b64()}
+    except SigningNotConfigured:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Signed verification is not configured",
+        )
+
+
 @router.get("/search", response_model=list[CertificateVerifyResponse])
 def search_certificates(
     email: str = Query(..., description="Email to search"),
-    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
 ):
     """
-    Search certificates by email (public endpoint)
+    Search certificates by email, case-insensitive (public endpoint)
     Returns only public information
     """
-    certificates = get_certificates_by_email(db, email)
+    certificates = get_certificates_by_email(db, email, skip=skip, limit=limit)
     return certificates
 
 
@@ -109,32 +352,99 @@ def create_new_certificate(
     return certificate
 
 
-@router.get("/admin/all", response_model=list[CertificateResponse])
+@router.get(
+    "/admin/all",
+    response_model=list[CertificatePartialResponse],
+    response_model_exclude_unset=True,
+)
 def get_all_certificates(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, description="Legacy offset, ignored when cursor is set"),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    fields: str | None = Query(None, description="Comma-separated columns to return"),
+    workshop_id: str | None = Query(None),
+    cert_status: str | None = Query(None, alias="status"),
+    email_status: str | None = Query(None),
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     """
-    Get all certificates (admin only)
+    Get all certificates, newest first (admin only).
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    certificates = get_certificates(db, skip=skip, limit=limit)
+    workshop_name = None
+    if workshop_id:
+        workshop = db.query(Workshop).filter(Workshop.id == workshop_id).first()
+        if not workshop:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Workshop not found",
+            )
+        workshop_name = workshop.title
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        certificates, next_cursor = get_certificates_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            skip=skip,
+            fields=field_list,
+            workshop_name=workshop_name,
+            status=cert_status,
+            email_status=email_status,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return certificates
 
 
-@router.get("/admin/stats")
-def get_certificate_stats(
+@router.get("/admin/stats", response_model=CertificateStatsResponse)
+def get_dashboard_stats(
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     """
-    Get certificate statistics (admin only)
+    Get certificate statistics, overall and per workshop (admin only)
     """
-    total = get_certificates_count(db)
-    return {
-        "total_certificates": total,
-    }
+    workshops = get_certificate_stats(db)
+    return CertificateStatsResponse(
+        total_certificates=sum(w["total"] for w in workshops),
+        generated=sum(w["generated"] for w in workshops),
+        pending=sum(w["pending"] for w in workshops),
+        sent=sum(w["sent"] for w in workshops),
+        failed=sum(w["failed"] for w in workshops),
+        workshops=workshops,
+    )
+
+
+@router.get("/admin/search", response_model=list[CertificateSearchResult])
+def search_certificates_admin(
+    q: str = Query(..., min_length=2, description="Name, email or code (typos tolerated)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_admin: Admin = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Fuzzy search certificates by recipient name, email or code,
+    best match first (admin only)
+    """
+    results = search_certificates_fuzzy(db, q, skip=skip, limit=limit)
+    return [
+        CertificateSearchResult(
+            score=score,
+            certificate=CertificateResponse.model_validate(cert),
+        )
+        for cert, score in results
+    ]
 
 
 @router.get("/admin/{certificate_id}", response_model=CertificateResponse)
@@ -257,14 +567,16 @@ def generate_certificate(
 def bulk_generate_certificates(
     workshop_id: str,
     background_tasks: BackgroundTasks,
+    trace: bool = Query(False, description="Also write a Chrome trace of the render stages"),
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     """
     Generate all pending certificates for a workshop (admin only).
-    Runs synchronously for reliability.
+    Runs synchronously for reliability. The response includes a per-stage
+    timing breakdown of the run.
     """
-    result = generate_certificates_for_workshop(db, workshop_id)
+    result = generate_certificates_for_workshop(db, workshop_id, trace=trace)
     return BulkGenerateResponse(**result)
 
 
@@ -293,13 +605,21 @@ def download_certificates_zip(
 @router.get("/download/{code}")
 def download_certificate_by_code(
     code: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
 ):
     """
-    Download a generated certificate PNG by code (public)
+    Download a generated certificate PNG by code (public).
+    Supports If-None-Match; the ETag changes whenever the file is re-generated.
     """
-    cert = get_certificate_by_code(db, code.upper())
+    if not code_filter.might_contain(normalize_code(code)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Certificate not found",
+        )
+    cert = get_certificate_by_code(db, code)
     if not cert:
+        code_filter.record_false_positive()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Certificate not found",
@@ -310,20 +630,36 @@ def download_certificate_by_code(
             detail="Certificate image has not been generated yet",
         )
     full_path = MEDIA_DIR / cert.file_path
-    if not full_path.exists():
+    try:
+        stat = full_path.stat()
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Certificate file not found on disk",
         )
+
+    etag = make_etag(cert.id, cert.updated_at, stat.st_mtime_ns, stat.st_size)
+    cache_control = settings.DOWNLOAD_CACHE_CONTROL
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, cache_control)
     return FileResponse(
         str(full_path),
         media_type="image/png",
         filename=f"certificate-{cert.code}.png",
+        stat_result=stat,
+        headers={"ETag": etag, "Cache-Control": cache_control},
     )
 
 
 # ============ Email Routes ============
 
+BACKGROUND_JOBS = Gauge(
+    "background_jobs",
+    "Background tasks queued or running, by job",
+    ["job"],
+)
+
+
 def _bg_send_single_email(certificate_id: str, force: bool) -> None:
     """Background task: send one email using a fresh DB session."""
     db = SessionLocal()
@@ -333,6 +669,7 @@ def _bg_send_single_email(certificate_id: str, force: bool) -> None:
         logger.exception("Background email send failed for %s", certificate_id)
     finally:
         db.close()
+        BACKGROUND_JOBS.dec(job="send_email")
 
 
 def _bg_send_workshop_emails(workshop_id: str, force: bool) -> None:
@@ -344,6 +681,7 @@ def _bg_send_workshop_emails(workshop_id: str, force: bool) -> None:
         logger.exception("Background bulk email failed for workshop %s", workshop_id)
     finally:
         db.close()
+        BACKGROUND_JOBS.dec(job="send_workshop_emails")
 
 
 @router.post("/admin/send-email/{certificate_id}")
@@ -370,6 +708,7 @@ def send_email(
             detail="Certificate must be generated before sending email",
         )
     background_tasks.add_task(_bg_send_single_email, certificate_id, force)
+    BACKGROUND_JOBS.inc(job="send_email")
     return {"success": True, "message": "Email send initiated"}
 
 
@@ -401,6 +740,7 @@ def send_workshop_emails(
         .count()
     )
     background_tasks.add_task(_bg_send_workshop_emails, workshop_id, force)
+    BACKGROUND_JOBS.inc(job="send_workshop_emails")
     return BulkEmailResponse(
         message=f"Sending emails for {total} certificates in background",
         total=total,
@@ -422,14 +762,10 @@ def get_email_status(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workshop not found",
         )
-    certs = (
-        db.query(Certificate)
-        .filter(Certificate.workshop_name == workshop.title)
-        .all()
-    )
-    total = len(certs)
-    sent = sum(1 for c in certs if c.email_status == "SENT")
-    failed = sum(1 for c in certs if c.email_status == "FAILED")
+    rows = get_certificate_stats(db, workshop_name=workshop.title)
+    total = rows[0]["total"] if rows else 0
+    sent = rows[0]["sent"] if rows else 0
+    failed = rows[0]["failed"] if rows else 0
     pending = total - sent - failed
 
     return EmailStatusResponse(
@@ -1,13 +1,37 @@
 """Image upload / list / delete endpoints for certificate templates per event."""
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi.concurrency import run_in_threadpool
+from config import settings
 from models import Admin
 from auth import get_current_admin
-from storage import upload_image, list_images, delete_image
+from storage import upload_image, list_images, delete_image, run_storage
+from services.template_image_service import InvalidTemplateImage, normalize_template_image
 
 router = APIRouter(prefix="/api/events", tags=["images"])
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_TYPES = {"image/png", "image/jpeg", "image/webp", "image/jpg"}
+CHUNK_SIZE = 256 * 1024
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="File too large. Maximum size is 10 MB.",
+    )
+
+
+async def _read_limited(file: UploadFile) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds MAX_FILE_SIZE."""
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise _too_large()
+
+    contents = bytearray()
+    while chunk := await file.read(CHUNK_SIZE):
+        contents += chunk
+        if len(contents) > MAX_FILE_SIZE:
+            raise _too_large()
+    return bytes(contents)
 
 
 @router.post("/{event_id}/images")
@@ -23,28 +47,35 @@ async def upload_event_image(
             detail=f"File type {file.content_type} not allowed. Use PNG, JPEG, or WebP.",
         )
 
-    contents = await file.read()
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large. Maximum size is 10 MB.",
-        )
+    contents = await _read_limited(file)
+    filename, content_type = file.filename or "image.png", file.content_type
+    width = height = None
+
+    if settings.TEMPLATE_NORMALIZE_ENABLED:
+        try:
+            contents, width, height = await run_in_threadpool(normalize_template_image, contents)
+        except InvalidTemplateImage:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File is not a readable image.",
+            )
+        filename, content_type = "image.png", "image/png"
 
     try:
-        url = upload_image(event_id, contents, file.filename or "image.png", file.content_type)
+        url = await run_storage(upload_image, event_id, contents, filename, content_type)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload image: {str(e)}",
         )
 
-    return {"url": url}
+    return {"url": url, "width": width, "height": height}
 
 
 @router.get("/{event_id}/images")
 async def get_event_images(event_id: str):
     """List all uploaded certificate images for an event (public)."""
-    urls = list_images(event_id)
+    urls = await run_storage(list_images, event_id)
     return {"images": urls}
 
 
@@ -55,7 +86,7 @@ async def delete_event_image(
     current_admin: Admin = Depends(get_current_admin),
 ):
     """Delete a certificate image (admin only)."""
-    success = delete_image(event_id, filename)
+    success = await run_storage(delete_image, event_id, filename)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
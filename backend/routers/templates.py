@@ -1,23 +1,53 @@
 """CRUD endpoints for certificate template metadata (positions) per event."""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from models import Admin, CertificateTemplate
+from models import Admin, CertificateTemplate, Workshop
 from schemas import TemplateCreate, TemplateUpdate, TemplateResponse
 from auth import get_current_admin
+from cache import invalidate_event_templates, template_list_cache
+from crud import get_latest_template
 from database import get_db
+from services.template_image_service import probe_dimensions
 
 router = APIRouter(prefix="/api/events", tags=["templates"])
 
 
+def _image_size(data: TemplateCreate, existing: CertificateTemplate | None) -> tuple:
+    """Width/height for a template: from the request, the stored row, or the image."""
+    if data.image_width and data.image_height:
+        return data.image_width, data.image_height
+    if existing is not None and existing.image_width and existing.image_height:
+        return existing.image_width, existing.image_height
+    return probe_dimensions(data.image_url) or (None, None)
+
+
+def _set_active(db: Session, event_id: str, template_id: str | None) -> None:
+    """Point the workshop at a template (committed with the caller's change)."""
+    db.query(Workshop).filter(Workshop.id == event_id).update(
+        {Workshop.active_template_id: template_id}, synchronize_session=False
+    )
+
+
 @router.get("/{event_id}/templates", response_model=list[TemplateResponse])
 def list_templates(event_id: str, db: Session = Depends(get_db)):
-    """Return all saved templates for an event (public)."""
-    return (
+    """Return all saved templates for an event (public, cached per event).
+
+    Misses read the primary so a lagging replica cannot refill the cache
+    with the list from before a save or delete.
+    """
+    cached = template_list_cache.get(event_id)
+    if cached is not None:
+        return list(cached)
+
+    templates = (
         db.query(CertificateTemplate)
         .filter(CertificateTemplate.event_id == event_id)
         .order_by(CertificateTemplate.created_at.desc())
         .all()
     )
+    result = [TemplateResponse.model_validate(t).model_dump() for t in templates]
+    template_list_cache.set(event_id, tuple(result))
+    return result
 
 
 @router.post("/{event_id}/templates", response_model=TemplateResponse, status_code=201)
@@ -27,7 +57,10 @@ def save_template(
     current_admin: Admin = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
-    """Create or update a template for a given image URL + event."""
+    """Create or update a template for a given image URL + event.
+
+    The saved template becomes the event's active template.
+    """
     # Upsert: if a template with this event + image_url already exists, update it
     existing = (
         db.query(CertificateTemplate)
@@ -38,7 +71,11 @@ def save_template(
         .first()
     )
 
+    width, height = _image_size(data, existing)
+
     if existing:
+        existing.image_width = width
+        existing.image_height = height
         existing.name_x = data.name_placeholder.x
         existing.name_y = data.name_placeholder.y
         existing.name_font_size = data.name_placeholder.fontSize
@@ -51,13 +88,17 @@ def save_template(
         existing.code_font_family = data.code_placeholder.fontFamily
         existing.code_alignment = data.code_placeholder.alignment
         existing.code_color = data.code_placeholder.color
+        _set_active(db, event_id, existing.id)
         db.commit()
+        invalidate_event_templates(event_id)
         db.refresh(existing)
         return existing
 
     template = CertificateTemplate(
         event_id=event_id,
         image_url=data.image_url,
+        image_width=width,
+        image_height=height,
         name_x=data.name_placeholder.x,
         name_y=data.name_placeholder.y,
         name_font_size=data.name_placeholder.fontSize,
@@ -72,11 +113,38 @@ def save_template(
         code_color=data.code_placeholder.color,
     )
     db.add(template)
+    db.flush()
+    _set_active(db, event_id, template.id)
     db.commit()
+    invalidate_event_templates(event_id)
     db.refresh(template)
     return template
 
 
+@router.post("/{event_id}/templates/{template_id}/activate", response_model=TemplateResponse)
+def activate_template(
+    event_id: str,
+    template_id: str,
+    current_admin: Admin = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """Use an existing template for rendering this event's certificates."""
+    template = (
+        db.query(CertificateTemplate)
+        .filter(
+            CertificateTemplate.id == template_id,
+            CertificateTemplate.event_id == event_id,
+        )
+        .first()
+    )
+    if not template:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    _set_active(db, event_id, template.id)
+    db.commit()
+    invalidate_event_templates(event_id)
+    return template
+
+
 @router.delete("/{event_id}/templates/{template_id}")
 def delete_template(
     event_id: str,
@@ -96,5 +164,12 @@ def delete_template(
     if not template:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
     db.delete(template)
+    db.flush()
+    workshop = db.get(Workshop, event_id)
+    if workshop is not None and workshop.active_template_id == template_id:
+        # Fall back to the newest remaining template
+        latest = get_latest_template(db, event_id)
+        _set_active(db, event_id, latest.id if latest else None)
     db.commit()
+    invalidate_event_templates(event_id)
     return {"success": True, "message": "Template deleted"}
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, get_read_db
 from models import Admin
 from schemas import WorkshopCreate, WorkshopResponse, WorkshopUpdate
 from auth import get_current_admin
@@ -22,7 +22,7 @@ router = APIRouter(prefix="/api/workshops", tags=["workshops"])
 def list_workshops(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get all workshops (public)
@@ -34,7 +34,7 @@ def list_workshops(
 @router.get("/{workshop_id}", response_model=WorkshopResponse)
 def get_workshop(
     workshop_id: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get a specific workshop (public)
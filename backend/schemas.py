@@ -1,7 +1,9 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
+from config import settings
+
 
 # Workshop Schemas
 class WorkshopBase(BaseModel):
@@ -79,6 +81,35 @@ class CertificateResponse(BaseModel):
         from_attributes = True
 
 
+class CertificateSearchResult(BaseModel):
+    """A fuzzy search hit with its similarity score (0–1)"""
+    score: float
+    certificate: CertificateResponse
+
+
+class CertificatePartialResponse(BaseModel):
+    """Sparse certificate row for the admin listing (``fields=`` parameter)"""
+    id: str
+    code: Optional[str] = None
+    recipient_name: Optional[str] = None
+    email: Optional[str] = None
+    workshop_name: Optional[str] = None
+    issue_date: Optional[str] = None
+    skills: Optional[List[str]] = None
+    instructor: Optional[str] = None
+    is_verified: Optional[bool] = None
+    status: Optional[str] = None
+    file_path: Optional[str] = None
+    email_status: Optional[str] = None
+    email_sent_at: Optional[datetime] = None
+    email_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class CertificateVerifyResponse(BaseModel):
     """Response for certificate verification (public)"""
     id: str
@@ -95,12 +126,43 @@ class CertificateVerifyResponse(BaseModel):
         from_attributes = True
 
 
+class SignedVerifyResponse(BaseModel):
+    """Result of checking a signed QR token (no database lookup)"""
+    valid: bool
+    code: str
+    workshop_name: str
+    issue_date: str
+    name_matches: Optional[bool] = None
+
+
+class BatchVerifyRequest(BaseModel):
+    """Request body for batch verification (public)"""
+    codes: List[str] = Field(..., min_length=1, max_length=settings.VERIFY_BATCH_MAX_CODES)
+
+
+class BatchVerifyResponse(BaseModel):
+    """Per-code verification results; null means not found or not valid"""
+    results: dict[str, Optional[CertificateVerifyResponse]]
+    found: int
+    not_found: int
+
+
+class StageTiming(BaseModel):
+    """Time spent in one rendering stage over a bulk run"""
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+
+
 class BulkGenerateResponse(BaseModel):
     """Response for bulk certificate generation"""
     total: int
     generated: int
     skipped: int
     failed: int
+    timings: Dict[str, StageTiming] = {}
+    trace_file: Optional[str] = None  # file name under RENDER_TRACE_DIR
 
 
 class EmailStatusResponse(BaseModel):
@@ -111,6 +173,26 @@ class EmailStatusResponse(BaseModel):
     pending: int
 
 
+class WorkshopStats(BaseModel):
+    """Certificate counts for one workshop"""
+    workshop_name: str
+    total: int
+    generated: int
+    pending: int
+    sent: int
+    failed: int
+
+
+class CertificateStatsResponse(BaseModel):
+    """Dashboard statistics, overall and per workshop"""
+    total_certificates: int
+    generated: int
+    pending: int
+    sent: int
+    failed: int
+    workshops: List[WorkshopStats]
+
+
 class BulkEmailResponse(BaseModel):
     """Response for bulk email trigger"""
     message: str
@@ -175,6 +257,8 @@ class PlaceholderPosition(BaseModel):
 
 class TemplateCreate(BaseModel):
     image_url: str
+    image_width: Optional[int] = None  # as returned by the image upload
+    image_height: Optional[int] = None
     name_placeholder: PlaceholderPosition = PlaceholderPosition()
     code_placeholder: PlaceholderPosition = PlaceholderPosition(x=50, y=70, fontSize=16, fontFamily="Courier New", color="#333333")
 
@@ -188,6 +272,8 @@ class TemplateResponse(BaseModel):
     id: str
     event_id: str
     image_url: str
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
     name_x: float
     name_y: float
     name_font_size: float
@@ -2,21 +2,41 @@
 
 import logging
 import os
+import time
 from io import BytesIO
 from pathlib import Path
+from urllib.parse import urlencode
 
-import httpx
 from PIL import Image, ImageDraw, ImageFont
 from sqlalchemy.orm import Session
 
+from cache import invalidate_certificate
+from config import settings
+from crud import get_active_template
+from metrics import Counter, Histogram
 from models import Certificate, CertificateTemplate, Workshop
+from signing import sign_certificate, signing_enabled
+from storage import read_template_bytes
+from tracing import SpanRecorder
 
 logger = logging.getLogger(__name__)
 
+RENDER_SECONDS = Histogram(
+    "certificate_render_seconds",
+    "Time to render and store one certificate, by outcome",
+    ["outcome"],
+)
+RENDERS = Counter(
+    "certificate_renders_total",
+    "Certificate render attempts by outcome (generated, failed)",
+    ["outcome"],
+)
+
 # ---------------------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------------------
-MEDIA_DIR = Path(__file__).resolve().parent.parent / "media"
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MEDIA_DIR = BACKEND_DIR / "media"
 CERTIFICATES_DIR = MEDIA_DIR / "certificates"
 FONTS_DIR = Path(__file__).resolve().parent.parent / "assets" / "fonts"
 
@@ -88,16 +108,48 @@ def _alignment_anchor(alignment: str) -> str:
     return {"left": "lm", "center": "mm", "right": "rm"}.get(alignment, "mm")
 
 
+# ---------------------------------------------------------------------------
+# Signed QR code
+# ---------------------------------------------------------------------------
+
+def _draw_signed_qr(img: Image.Image, cert: Certificate) -> None:
+    """Stamp a QR code linking to the verify page with a signed token.
+
+    The link opens the frontend's /verify route with ``code`` and ``t`` query
+    parameters; the page checks ``t`` against /api/certificates/verify-signed
+    (see signing.py), which needs no database lookup.
+    """
+    import qrcode
+
+    token = sign_certificate(cert.code, cert.recipient_name, cert.workshop_name, cert.issue_date)
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2)
+    qr.add_data(f"{settings.FRONTEND_VERIFY_URL}?{urlencode({'code': cert.code, 't': token})}")
+    qr.make(fit=True)
+
+    w, h = img.size
+    size = max(1, int(h * settings.CERT_QR_SIZE / 100))
+    qr_img = qr.make_image(fill_color="black", back_color="white").get_image()
+    qr_img = qr_img.convert("RGBA").resize((size, size), Image.NEAREST)
+    x = int(settings.CERT_QR_X / 100 * w - size / 2)
+    y = int(settings.CERT_QR_Y / 100 * h - size / 2)
+    img.paste(qr_img, (x, y))
+
+
 # ---------------------------------------------------------------------------
 # Single certificate generation
 # ---------------------------------------------------------------------------
 
-def generate_single_certificate(db: Session, certificate_id: str) -> str | None:
+def generate_single_certificate(
+    db: Session, certificate_id: str, spans: SpanRecorder | None = None
+) -> str | None:
     """
     Generate a PNG for one certificate.
 
-    Returns the relative file_path on success, None on failure.
+    Stage timings are recorded on ``spans`` when given (bulk runs pass one
+    recorder for the whole run). Returns the relative file_path on success,
+    None on failure.
     """
+    spans = spans or SpanRecorder()
     cert = db.query(Certificate).filter(Certificate.id == certificate_id).first()
     if not cert:
         logger.error("Certificate %s not found", certificate_id)
@@ -110,86 +162,105 @@ def generate_single_certificate(db: Session, certificate_id: str) -> str | None:
             return cert.file_path
 
     # Find workshop + template
-    workshop = (
-        db.query(Workshop)
-        .filter(Workshop.title == cert.workshop_name)
-        .first()
-    )
+    with spans.span("template_lookup"):
+        workshop = (
+            db.query(Workshop)
+            .filter(Workshop.title == cert.workshop_name)
+            .first()
+        )
+        template = get_active_template(db, workshop) if workshop else None
     if not workshop:
         logger.error("No workshop found for '%s'", cert.workshop_name)
         return None
-
-    template: CertificateTemplate | None = (
-        db.query(CertificateTemplate)
-        .filter(CertificateTemplate.event_id == workshop.id)
-        .order_by(CertificateTemplate.created_at.desc())
-        .first()
-    )
     if not template:
         logger.error("No template for workshop %s", workshop.id)
         return None
 
+    started = time.perf_counter()
     try:
-        return _render_certificate(db, cert, template)
+        with spans.span("render", code=cert.code):
+            result = _render_certificate(db, cert, template, spans)
     except Exception:
         logger.exception("Failed to render certificate %s", cert.code)
-        return None
+        result = None
+    outcome = "generated" if result else "failed"
+    RENDER_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+    RENDERS.inc(outcome=outcome)
+    return result
 
 
 def _render_certificate(
     db: Session,
     cert: Certificate,
     tpl: CertificateTemplate,
+    spans: SpanRecorder,
 ) -> str:
-    """Download template image, draw text, save PNG, update DB."""
-    # 1 – Download template image
-    with httpx.Client(timeout=30) as client:
-        resp = client.get(tpl.image_url)
-        resp.raise_for_status()
-
-    img = Image.open(BytesIO(resp.content)).convert("RGBA")
+    """Load template image, draw text, save PNG, update DB."""
+    # 1 – Read template image from the storage backend
+    with spans.span("template_fetch"):
+        template_bytes = read_template_bytes(tpl.image_url)
+
+    with spans.span("decode"):
+        img = Image.open(BytesIO(template_bytes))
+        if img.mode != "RGBA":
+            # Templates normalized at upload are already RGBA; older ones are not
+            img = img.convert("RGBA")
+        img.load()
     draw = ImageDraw.Draw(img)
     w, h = img.size
 
-    # 2 – Draw name
-    name_x = (tpl.name_x / 100) * w
-    name_y = (tpl.name_y / 100) * h
     scale_factor = h / 500  # Editor preview height is ~500px
     name_font_size = max(1, int(tpl.name_font_size * scale_factor))
-    name_font = _get_font(tpl.name_font_family, name_font_size)
-    draw.text(
-        (name_x, name_y),
-        cert.recipient_name,
-        font=name_font,
-        fill=tpl.name_color,
-        anchor=_alignment_anchor(tpl.name_alignment),
-    )
-
-    # 3 – Draw code
-    code_x = (tpl.code_x / 100) * w
-    code_y = (tpl.code_y / 100) * h
     code_font_size = max(1, int(tpl.code_font_size * scale_factor))
-    code_font = _get_font(tpl.code_font_family, code_font_size)
-    draw.text(
-        (code_x, code_y),
-        cert.code,
-        font=code_font,
-        fill=tpl.code_color,
-        anchor=_alignment_anchor(tpl.code_alignment),
-    )
+    with spans.span("font_load"):
+        name_font = _get_font(tpl.name_font_family, name_font_size)
+        code_font = _get_font(tpl.code_font_family, code_font_size)
+
+    with spans.span("draw_text"):
+        # 2 – Draw name
+        draw.text(
+            ((tpl.name_x / 100) * w, (tpl.name_y / 100) * h),
+            cert.recipient_name,
+            font=name_font,
+            fill=tpl.name_color,
+            anchor=_alignment_anchor(tpl.name_alignment),
+        )
+
+        # 3 – Draw code
+        draw.text(
+            ((tpl.code_x / 100) * w, (tpl.code_y / 100) * h),
+            cert.code,
+            font=code_font,
+            fill=tpl.code_color,
+            anchor=_alignment_anchor(tpl.code_alignment),
+        )
+
+    # 4 – Signed QR code (optional)
+    if settings.CERT_QR_ENABLED:
+        if signing_enabled():
+            with spans.span("qr"):
+                _draw_signed_qr(img, cert)
+        else:
+            logger.warning("CERT_QR_ENABLED is set but CERT_SIGNING_PRIVATE_KEY is missing; skipping QR")
 
-    # 4 – Save
+    # 5 – Encode, then save
+    with spans.span("encode"):
+        buf = BytesIO()
+        img.convert("RGB").save(buf, "PNG")
     CERTIFICATES_DIR.mkdir(parents=True, exist_ok=True)
     filename = f"{cert.code}.png"
     rel_path = f"certificates/{filename}"
     out_path = MEDIA_DIR / rel_path
-    img.convert("RGB").save(str(out_path), "PNG", quality=95)
+    with spans.span("write"):
+        out_path.write_bytes(buf.getbuffer())
 
-    # 5 – Update DB
-    cert.file_path = rel_path
-    cert.status = "GENERATED"
-    db.commit()
-    db.refresh(cert)
+    # 6 – Update DB
+    with spans.span("db_commit"):
+        cert.file_path = rel_path
+        cert.status = "GENERATED"
+        db.commit()
+        db.refresh(cert)
+    invalidate_certificate(cert.code)
 
     logger.info("Generated %s → %s", cert.code, rel_path)
     return rel_path
@@ -200,12 +271,15 @@ def _render_certificate(
 # ---------------------------------------------------------------------------
 
 def generate_certificates_for_workshop(
-    db: Session, workshop_id: str
+    db: Session, workshop_id: str, trace: bool = False
 ) -> dict:
     """
     Generate certificates for all PENDING certs in a workshop.
 
-    Returns {total, generated, skipped, failed}.
+    Returns {total, generated, skipped, failed, timings, trace_file}, where
+    timings is the per-stage breakdown of the run. With ``trace`` the spans
+    are also written as a Chrome trace file under RENDER_TRACE_DIR and
+    trace_file is its name relative to that directory.
     """
     workshop = db.query(Workshop).filter(Workshop.id == workshop_id).first()
     if not workshop:
@@ -221,6 +295,7 @@ def generate_certificates_for_workshop(
     generated = 0
     skipped = 0
     failed = 0
+    spans = SpanRecorder(keep_events=trace)
 
     for cert in certs:
         if cert.status == "GENERATED" and cert.file_path:
@@ -229,10 +304,26 @@ def generate_certificates_for_workshop(
                 skipped += 1
                 continue
 
-        result = generate_single_certificate(db, cert.id)
+        result = generate_single_certificate(db, cert.id, spans)
         if result:
             generated += 1
         else:
             failed += 1
 
-    return {"total": total, "generated": generated, "skipped": skipped, "failed": failed}
+    trace_file = None
+    if trace:
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        path = BACKEND_DIR / settings.RENDER_TRACE_DIR / f"render-{workshop_id[:8]}-{stamp}.json"
+        spans.write_trace(path)
+        logger.info("Wrote render trace to %s", path)
+        # Only the name: the absolute server path is not for API clients
+        trace_file = path.name
+
+    return {
+        "total": total,
+        "generated": generated,
+        "skipped": skipped,
+        "failed": failed,
+        "timings": spans.summary(),
+        "trace_file": trace_file,
+    }
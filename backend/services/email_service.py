@@ -6,10 +6,12 @@ import time
 from datetime import datetime
 from email.message import EmailMessage
 from pathlib import Path
+from urllib.parse import urlencode
 
 from sqlalchemy.orm import Session
 
 from config import settings
+from metrics import Counter, Histogram
 from models import Certificate, Workshop
 
 logger = logging.getLogger(__name__)
@@ -21,6 +23,17 @@ MEDIA_DIR = Path(__file__).resolve().parent.parent / "media"
 MAX_BATCH_SIZE = 1000
 SEND_DELAY_SECONDS = 0.3
 
+EMAILS = Counter(
+    "certificate_emails_total",
+    "Certificate email attempts by outcome (sent, failed, skipped)",
+    ["outcome"],
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "certificate_email_send_seconds",
+    "Time spent in the SMTP exchange per email, by outcome",
+    ["outcome"],
+)
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -42,7 +55,7 @@ def _build_email_message(
     msg["From"] = settings.EMAIL_FROM or settings.EMAIL_USERNAME
     msg["To"] = cert.email
 
-    verify_url = f"{settings.FRONTEND_VERIFY_URL}/{cert.verification_code}"
+    verify_url = f"{settings.FRONTEND_VERIFY_URL}?{urlencode({'code': cert.code})}"
 
     body = (
         f"Dear {cert.recipient_name},\n\n"
@@ -116,6 +129,7 @@ def send_certificate_email(db: Session, certificate_id: str, force: bool = False
     # Guard: idempotency — skip if already sent (unless forced)
     if cert.email_status == "SENT" and not force:
         logger.info("Certificate %s already sent, skipping", cert.code)
+        EMAILS.inc(outcome="skipped")
         return True  # not an error, already done
 
     # Guard: email config
@@ -125,13 +139,20 @@ def send_certificate_email(db: Session, certificate_id: str, force: bool = False
 
     try:
         msg = _build_email_message(cert, cert.workshop_name, png_path)
-        _smtp_send(msg)
+        started = time.perf_counter()
+        try:
+            _smtp_send(msg)
+        except Exception:
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, outcome="failed")
+            raise
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - started, outcome="sent")
 
         # Success
         cert.email_status = "SENT"
         cert.email_sent_at = datetime.utcnow()
         cert.email_error = None
         db.commit()
+        EMAILS.inc(outcome="sent")
         logger.info("Email sent for certificate %s → %s", cert.code, cert.email)
         return True
 
@@ -211,6 +232,7 @@ def send_bulk_certificate_emails(
 def _mark_failed(db: Session, cert: Certificate, error_msg: str) -> None:
     """Mark a certificate email as FAILED with the given error message."""
     logger.error("Email failed for %s: %s", cert.code, error_msg)
+    EMAILS.inc(outcome="failed")
     cert.email_status = "FAILED"
     cert.email_error = error_msg[:2000]  # Truncate to avoid huge DB entries
     db.commit()
@@ -0,0 +1,247 @@
+"""Signed static verification manifests for serving lookups from a CDN.
+
+A full export writes::
+
+    <out>/manifest.json        shard index, counts, shard SHA-256 hashes, KDF
+    <out>/manifest.json.sig    Ed25519 signature over manifest.json
+    <out>/shards/<prefix>.json {entry key: public fields} for one shard
+
+Entries are keyed by ``scrypt(code.upper(), salt)`` (hex) with the salt and
+cost parameters published in manifest.json; a code lives in the shard named
+by the first ``prefix_length`` digits of its key. A client derives the key of
+the code it was given, fetches manifest.json, checks its signature with the
+published key, then fetches the one shard it needs and checks that shard's
+hash against the manifest.
+
+Codes carry only 32 random bits, so any fast hash of them could be inverted
+by trying every code. The slow, salted KDF raises that to roughly
+``2**32 * KDF cost`` of CPU time per manifest salt, which is expensive but
+not impossible: the manifest still exposes recipient names to anyone
+prepared to spend it. Do not publish manifests where that is unacceptable.
+
+A delta export writes ``<out>/deltas/delta-<until>.json`` (+ ``.sig``) with
+the certificates changed since a given ``updated_at`` watermark, keyed with
+the full manifest's salt. Deltas carry upserts and keys of codes whose
+``is_verified`` flag was cleared; hard deletes are not visible through
+``updated_at`` and only disappear on the next full export.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from models import Certificate
+from signing import public_key_b64, sign_bytes
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 3
+# scrypt cost for entry keys, about 50 ms and 16 MiB per code
+KDF_PARAMS = {"name": "scrypt", "n": 2 ** 14, "r": 8, "p": 1, "dklen": 32}
+_COLUMNS = (
+    Certificate.code,
+    Certificate.recipient_name,
+    Certificate.workshop_name,
+    Certificate.issue_date,
+    Certificate.skills,
+    Certificate.instructor,
+    Certificate.is_verified,
+    Certificate.file_path,
+    Certificate.updated_at,
+)
+
+
+def entry_key(code: str, salt: bytes) -> str:
+    """Manifest key for a code: hex scrypt of the upper-cased code."""
+    return hashlib.scrypt(
+        code.upper().encode("utf-8"),
+        salt=salt,
+        n=KDF_PARAMS["n"],
+        r=KDF_PARAMS["r"],
+        p=KDF_PARAMS["p"],
+        dklen=KDF_PARAMS["dklen"],
+    ).hex()
+
+
+def shard_key(code: str, salt: bytes, prefix_length: int) -> str:
+    """Shard name for a code."""
+    return entry_key(code, salt)[:prefix_length]
+
+
+_BATCH_SIZE = 5000
+
+
+def _keyed_rows(rows, salt: bytes):
+    """Yield (row, entry key), deriving keys for each batch in parallel."""
+    # hashlib.scrypt releases the GIL, so threads use every core
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == _BATCH_SIZE:
+                yield from zip(batch, pool.map(lambda r: entry_key(r.code, salt), batch))
+                batch = []
+        yield from zip(batch, pool.map(lambda r: entry_key(r.code, salt), batch))
+
+
+def _kdf_description(salt: bytes) -> dict:
+    return {**KDF_PARAMS, "input": "upper(code)", "salt": salt.hex()}
+
+
+def manifest_salt(out_dir: Path) -> bytes | None:
+    """Salt of the full manifest in out_dir, if its KDF matches KDF_PARAMS."""
+    path = Path(out_dir) / "manifest.json"
+    if not path.exists():
+        return None
+    kdf = json.loads(path.read_bytes()).get("entry_key")
+    if not isinstance(kdf, dict) or any(kdf.get(k) != v for k, v in KDF_PARAMS.items()):
+        return None
+    return bytes.fromhex(kdf["salt"])
+
+
+def _public_fields(row) -> dict:
+    # No code and no file path (it contains the code); clients already know
+    # the code they are checking and can build the image URL from it
+    return {
+        "recipient_name": row.recipient_name,
+        "workshop_name": row.workshop_name,
+        "issue_date": row.issue_date,
+        "skills": row.skills or [],
+        "instructor": row.instructor,
+        "has_certificate": bool(row.file_path),
+    }
+
+
+def _dump(data) -> bytes:
+    """Deterministic compact JSON so unchanged content hashes identically."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _write_signed(path: Path, body: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    path.with_name(path.name + ".sig").write_text(sign_bytes(body))
+
+
+def export_full_manifest(
+    db: Session, out_dir: Path, prefix_length: int = 2, rotate_salt: bool = False
+) -> dict:
+    """Write a full sharded manifest of every valid certificate.
+
+    The previous export's salt is reused so unchanged shards stay
+    byte-identical for CDN caches; ``rotate_salt`` picks a new one and
+    removes deltas keyed with the old salt. Returns the manifest dict.
+    """
+    out_dir = Path(out_dir)
+    salt = None if rotate_salt else manifest_salt(out_dir)
+    if salt is None:
+        salt = secrets.token_bytes(16)
+        for stale in (out_dir / "deltas").glob("delta-*"):
+            stale.unlink()
+    shards: dict[str, dict[str, dict]] = {}
+    watermark = None
+
+    rows = db.query(*_COLUMNS).filter(Certificate.is_verified.is_(True)).yield_per(_BATCH_SIZE)
+    for row, key in _keyed_rows(rows, salt):
+        shards.setdefault(key[:prefix_length], {})[key] = _public_fields(row)
+        if row.updated_at and (watermark is None or row.updated_at > watermark):
+            watermark = row.updated_at
+
+    shard_dir = out_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    # Remove shards left over from an earlier export with different content
+    for stale in shard_dir.glob("*.json"):
+        if stale.stem not in shards:
+            stale.unlink()
+
+    index = {}
+    for key in sorted(shards):
+        body = _dump(shards[key])
+        (shard_dir / f"{key}.json").write_bytes(body)
+        index[key] = {
+            "file": f"shards/{key}.json",
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "count": len(shards[key]),
+        }
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "type": "full",
+        "generated_at": datetime.utcnow().isoformat(),
+        "watermark": watermark.isoformat() if watermark else None,
+        "count": sum(entry["count"] for entry in index.values()),
+        "entry_key": _kdf_description(salt),
+        "shard_prefix_length": prefix_length,
+        "shards": index,
+        "public_key": public_key_b64(),
+    }
+    _write_signed(out_dir / "manifest.json", _dump(manifest))
+    logger.info("Exported manifest: %d certificates in %d shards", manifest["count"], len(index))
+    return manifest
+
+
+def export_delta(db: Session, out_dir: Path, since: datetime) -> dict | None:
+    """Write a delta of certificates updated after ``since``.
+
+    Keys use the salt of the full manifest in out_dir, which must exist.
+    Returns the delta dict, or None when nothing changed.
+    """
+    out_dir = Path(out_dir)
+    salt = manifest_salt(out_dir)
+    if salt is None:
+        raise ValueError(f"No full manifest with current KDF parameters in {out_dir}")
+    upserts: dict[str, dict] = {}
+    revoked: list[str] = []
+    until = None
+
+    rows = (
+        db.query(*_COLUMNS)
+        .filter(Certificate.updated_at > since)
+        .order_by(Certificate.updated_at)
+        .yield_per(_BATCH_SIZE)
+    )
+    for row, key in _keyed_rows(rows, salt):
+        if row.is_verified:
+            upserts[key] = _public_fields(row)
+        else:
+            revoked.append(key)
+        until = row.updated_at
+
+    if until is None:
+        return None
+
+    delta = {
+        "version": MANIFEST_VERSION,
+        "type": "delta",
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "upserts": upserts,
+        "revoked": sorted(revoked),
+        "entry_key": _kdf_description(salt),
+        "public_key": public_key_b64(),
+    }
+    stamp = until.strftime("%Y%m%dT%H%M%S%f")
+    _write_signed(out_dir / "deltas" / f"delta-{stamp}.json", _dump(delta))
+    logger.info("Exported delta: %d upserts, %d revoked", len(upserts), len(revoked))
+    return delta
+
+
+def latest_watermark(out_dir: Path) -> datetime | None:
+    """Newest watermark recorded by the full manifest or any delta in out_dir."""
+    out_dir = Path(out_dir)
+    candidates = []
+    manifest = out_dir / "manifest.json"
+    if manifest.exists():
+        value = json.loads(manifest.read_bytes()).get("watermark")
+        if value:
+            candidates.append(datetime.fromisoformat(value))
+    for path in (out_dir / "deltas").glob("delta-*.json"):
+        candidates.append(datetime.fromisoformat(json.loads(path.read_bytes())["until"]))
+    return max(candidates) if candidates else None
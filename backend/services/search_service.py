@@ -0,0 +1,135 @@
+"""Fuzzy certificate search over recipient name, email and code.
+
+PostgreSQL uses pg_trgm's word similarity, backed by the
+``ix_certificates_search_trgm`` GIN index (see database.MIGRATIONS).
+Other databases (SQLite in local runs), and PostgreSQL servers where the
+pg_trgm extension could not be created, fall back to a pure-Python trigram
+scorer that streams only the searched columns.
+"""
+
+import heapq
+import logging
+
+from sqlalchemy import func, literal, literal_column, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models import Certificate
+
+logger = logging.getLogger(__name__)
+
+# Minimum score for a row to count as a match (0–1)
+PYTHON_MIN_SCORE = 0.5
+# Rows fetched per round-trip by the Python fallback
+_SCAN_BATCH_SIZE = 2000
+
+
+def _search_expression():
+    """Lower-cased concatenation of the searchable columns.
+
+    Must stay identical to the expression indexed by migration 4, so the
+    separators are rendered inline rather than as bound parameters.
+    """
+    sep = literal_column("' '")
+    return func.lower(
+        Certificate.recipient_name + sep + Certificate.email + sep + Certificate.code
+    )
+
+
+# ---------------------------------------------------------------------------
+# Pure-Python trigram scoring (mirrors pg_trgm semantics closely enough)
+# ---------------------------------------------------------------------------
+
+def _trigrams(text: str) -> set[str]:
+    """Return the pg_trgm-style trigram set of a string."""
+    grams: set[str] = set()
+    for word in "".join(c if c.isalnum() else " " for c in text.lower()).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(query_grams: set[str], text: str) -> float:
+    """Share of the query's trigrams found in text.
+
+    This approximates pg_trgm's word_similarity, so a short query is not
+    penalised for matching part of a long string.
+    """
+    if not query_grams:
+        return 0.0
+    return len(query_grams & _trigrams(text)) / len(query_grams)
+
+
+def _search_python(db: Session, q: str, skip: int, limit: int) -> list[tuple[Certificate, float]]:
+    """Score every certificate in Python, keeping only the top skip+limit rows."""
+    query_grams = _trigrams(q)
+    keep = skip + limit
+    top: list[tuple[float, str]] = []
+
+    rows = db.query(
+        Certificate.id, Certificate.recipient_name, Certificate.email, Certificate.code
+    ).yield_per(_SCAN_BATCH_SIZE)
+    for cert_id, name, email, code in rows:
+        score = _similarity(query_grams, f"{name} {email} {code}")
+        if score < PYTHON_MIN_SCORE:
+            continue
+        if len(top) < keep:
+            heapq.heappush(top, (score, cert_id))
+        elif score > top[0][0]:
+            heapq.heapreplace(top, (score, cert_id))
+
+    ranked = sorted(top, key=lambda item: (-item[0], item[1]))[skip:]
+    if not ranked:
+        return []
+    by_id = {
+        c.id: c
+        for c in db.query(Certificate).filter(Certificate.id.in_([cid for _, cid in ranked]))
+    }
+    return [(by_id[cid], round(score, 4)) for score, cid in ranked if cid in by_id]
+
+
+def _search_postgres(db: Session, q: str, skip: int, limit: int) -> list[tuple[Certificate, float]]:
+    """Rank with pg_trgm word_similarity; the ``<%`` filter uses the GIN index."""
+    expr = _search_expression()
+    score = func.word_similarity(q, expr)
+    rows = (
+        db.query(Certificate, score.label("score"))
+        .filter(literal(q).op("<%")(expr))
+        .order_by(score.desc(), Certificate.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [(cert, round(float(s), 4)) for cert, s in rows]
+
+
+# Whether pg_trgm is installed, checked once per process (migration 4 only
+# warns when it cannot create the extension)
+_pg_trgm_available: bool | None = None
+
+
+def _has_pg_trgm(db: Session) -> bool:
+    global _pg_trgm_available
+    if _pg_trgm_available is None:
+        try:
+            _pg_trgm_available = db.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+        except SQLAlchemyError:
+            db.rollback()
+            _pg_trgm_available = False
+        if not _pg_trgm_available:
+            logger.warning("pg_trgm is not installed; fuzzy search uses the Python fallback")
+    return _pg_trgm_available
+
+
+def search_certificates_fuzzy(
+    db: Session, q: str, skip: int = 0, limit: int = 20
+) -> list[tuple[Certificate, float]]:
+    """Return (certificate, score) pairs ranked best match first."""
+    q = q.strip().lower()
+    if not q:
+        return []
+    if db.get_bind().dialect.name == "postgresql" and _has_pg_trgm(db):
+        return _search_postgres(db, q, skip, limit)
+    return _search_python(db, q, skip, limit)
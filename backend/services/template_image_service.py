@@ -0,0 +1,68 @@
+"""Normalize uploaded certificate template images.
+
+Uploads are downscaled so their long edge fits the print size at
+``TEMPLATE_PRINT_DPI``, EXIF-rotated, converted to RGBA (the mode rendering
+draws on) and re-encoded as PNG without metadata. Renders then decode a
+smaller, pre-converted base instead of the original upload.
+"""
+
+import logging
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from config import settings
+from storage import read_template_bytes
+
+logger = logging.getLogger(__name__)
+
+WORKING_MODE = "RGBA"
+
+
+class InvalidTemplateImage(ValueError):
+    """Raised when uploaded bytes are not a readable image."""
+
+
+def max_template_edge() -> int:
+    """Longest allowed template edge in pixels."""
+    return round(settings.TEMPLATE_PRINT_DPI * settings.TEMPLATE_PRINT_LONG_EDGE_INCHES)
+
+
+def normalize_template_image(data: bytes) -> tuple[bytes, int, int]:
+    """Return (png_bytes, width, height) for a normalized template image."""
+    try:
+        img = Image.open(BytesIO(data))
+        max_edge = max_template_edge()
+        # JPEG can decode directly at a reduced scale, which is much cheaper
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidTemplateImage(str(e)) from e
+
+    original = img.size
+    if max(img.size) > max_edge:
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if img.mode != WORKING_MODE:
+        img = img.convert(WORKING_MODE)
+
+    out = BytesIO()
+    # A fresh save without pnginfo/exif drops all source metadata
+    dpi = settings.TEMPLATE_PRINT_DPI
+    img.save(out, "PNG", dpi=(dpi, dpi))
+    width, height = img.size
+
+    logger.info(
+        "Normalized template %dx%d → %dx%d (%d → %d bytes)",
+        original[0], original[1], width, height, len(data), out.tell(),
+    )
+    return out.getvalue(), width, height
+
+
+def probe_dimensions(image_url: str) -> tuple[int, int] | None:
+    """Read a stored template's size (for templates saved without one)."""
+    try:
+        with Image.open(BytesIO(read_template_bytes(image_url))) as img:
+            return img.size
+    except Exception:
+        logger.warning("Could not read template dimensions for %s", image_url)
+        return None
@@ -0,0 +1,143 @@
+"""Ed25519 signing of compact certificate payloads for offline verification.
+
+A signed token carries the certificate code, a short hash of the recipient
+name, the workshop name and the issue date. Anyone holding the public key can
+check it without a database; the trade-off is that a token stays valid after
+the certificate is deleted, so revocation still needs the online check.
+
+Generate a key pair with ``python signing.py``.
+"""
+import base64
+import hashlib
+import json
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+    Ed25519PublicKey,
+)
+
+from config import settings
+
+TOKEN_VERSION = 1
+
+
+class SigningNotConfigured(RuntimeError):
+    """Raised when no signing key is configured."""
+
+
+class InvalidToken(ValueError):
+    """Raised when a token is malformed or its signature does not verify."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+@lru_cache(maxsize=1)
+def _private_key() -> Ed25519PrivateKey:
+    if not settings.CERT_SIGNING_PRIVATE_KEY:
+        raise SigningNotConfigured("CERT_SIGNING_PRIVATE_KEY is not set")
+    return Ed25519PrivateKey.from_private_bytes(_b64decode(settings.CERT_SIGNING_PRIVATE_KEY))
+
+
+@lru_cache(maxsize=1)
+def _public_key() -> Ed25519PublicKey:
+    if settings.CERT_SIGNING_PUBLIC_KEY:
+        return Ed25519PublicKey.from_public_bytes(_b64decode(settings.CERT_SIGNING_PUBLIC_KEY))
+    return _private_key().public_key()
+
+
+def signing_enabled() -> bool:
+    return bool(settings.CERT_SIGNING_PRIVATE_KEY)
+
+
+def public_key_b64() -> str:
+    """The raw public key, base64url-encoded (for publishing to verifiers)."""
+    raw = _public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    )
+    return _b64encode(raw)
+
+
+def name_hash(name: str) -> str:
+    """Short, case- and whitespace-insensitive hash of a recipient name."""
+    normalized = " ".join(name.split()).casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def sign_bytes(data: bytes) -> str:
+    """Detached base64url Ed25519 signature over arbitrary bytes."""
+    return _b64encode(_private_key().sign(data))
+
+
+def verify_bytes(data: bytes, signature: str) -> bool:
+    try:
+        _public_key().verify(_b64decode(signature), data)
+        return True
+    except (InvalidSignature, ValueError):
+        return False
+
+
+def sign_certificate(code: str, recipient_name: str, workshop_name: str, issue_date: str) -> str:
+    """Return a compact ``<payload>.<signature>`` token for a certificate."""
+    payload = json.dumps(
+        {
+            "v": TOKEN_VERSION,
+            "c": code,
+            "n": name_hash(recipient_name),
+            "w": workshop_name,
+            "d": issue_date,
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    return f"{_b64encode(payload)}.{sign_bytes(payload)}"
+
+
+def verify_token(token: str) -> dict:
+    """Check a token's signature and return its decoded fields.
+
+    Raises InvalidToken if the token is malformed or forged.
+    """
+    try:
+        payload_part, signature = token.strip().split(".", 1)
+        payload = _b64decode(payload_part)
+    except ValueError:
+        raise InvalidToken("Malformed token")
+
+    if not verify_bytes(payload, signature):
+        raise InvalidToken("Invalid signature")
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        raise InvalidToken("Malformed payload")
+    if data.get("v") != TOKEN_VERSION:
+        raise InvalidToken("Unsupported token version")
+    return {
+        "code": data["c"],
+        "name_hash": data["n"],
+        "workshop_name": data["w"],
+        "issue_date": data["d"],
+    }
+
+
+if __name__ == "__main__":
+    key = Ed25519PrivateKey.generate()
+    private_raw = key.private_bytes(
+        serialization.Encoding.Raw,
+        serialization.PrivateFormat.Raw,
+        serialization.NoEncryption(),
+    )
+    public_raw = key.public_key().public_bytes(
+        serialization.Encoding.Raw, serialization.PublicFormat.Raw
+    )
+    print(f"CERT_SIGNING_PRIVATE_KEY={_b64encode(private_raw)}")
+    print(f"CERT_SIGNING_PUBLIC_KEY={_b64encode(public_raw)}")
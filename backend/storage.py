@@ -1,23 +1,182 @@
-"""Supabase Storage helpers for certificate images."""
-from supabase import create_client
-from config import settings
+"""Storage backends for certificate template images.
+
+``STORAGE_BACKEND`` selects the implementation:
+
+* ``supabase`` – Supabase Storage bucket (default, production)
+* ``local``    – files under ``LOCAL_STORAGE_DIR`` served from ``/media``;
+  needs no network, so rendering can run and be benchmarked offline.
+
+The module-level helpers (upload_image, list_images, ...) keep the API the
+routers and services use; they delegate to the configured backend.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO
+from io import BytesIO
+import asyncio
+import functools
+import importlib.util
+import threading
 import uuid
 
+import httpx
+
+from cache import image_list_cache, template_fetch_cache
+from config import settings
+from metrics import Gauge
+
 BUCKET_NAME = "certificate-images"
 
-_client = None
+MEDIA_DIR = Path(__file__).resolve().parent / "media"
 
 
-def get_supabase():
-    """Lazily initialise the Supabase client."""
-    global _client
-    if _client is None:
-        if not settings.SUPABASE_URL or not settings.SUPABASE_SERVICE_KEY:
-            raise RuntimeError(
-                "SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env"
-            )
-        _client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-    return _client
+class StorageBackend:
+    """Interface every storage backend implements. Paths are '<event>/<file>'."""
+
+    def upload(self, path: str, data: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    def list(self, folder: str) -> list[str]:
+        """Return file names (not paths) in a folder."""
+        raise NotImplementedError
+
+    def delete(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def open(self, path: str) -> BinaryIO:
+        """Open a stored file for reading."""
+        raise NotImplementedError
+
+    def public_url(self, path: str) -> str:
+        raise NotImplementedError
+
+    def path_from_url(self, url: str) -> str | None:
+        """Map a public URL produced by this backend back to its path."""
+        prefix = self.public_url("")
+        if url.startswith(prefix):
+            return url[len(prefix):].split("?", 1)[0]
+        return None
+
+    def read(self, path: str) -> bytes:
+        with self.open(path) as f:
+            return f.read()
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage bucket."""
+
+    def __init__(self):
+        self._client = None
+
+    def _bucket(self):
+        """Lazily initialise the Supabase client."""
+        if self._client is None:
+            if not settings.SUPABASE_URL or not settings.SUPABASE_SERVICE_KEY:
+                raise RuntimeError(
+                    "SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env"
+                )
+            from supabase import create_client
+
+            self._client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        return self._client.storage.from_(BUCKET_NAME)
+
+    def upload(self, path: str, data: bytes, content_type: str) -> None:
+        self._bucket().upload(path, data, file_options={"content-type": content_type})
+
+    def list(self, folder: str) -> list[str]:
+        files = self._bucket().list(folder)
+        return [f.get("name", "") for f in files]
+
+    def delete(self, path: str) -> bool:
+        try:
+            self._bucket().remove([path])
+            return True
+        except Exception:
+            return False
+
+    def open(self, path: str) -> BinaryIO:
+        return BytesIO(self._bucket().download(path))
+
+    def public_url(self, path: str) -> str:
+        # Same format as the client's get_public_url, built without a call
+        base = settings.SUPABASE_URL.rstrip("/")
+        return f"{base}/storage/v1/object/public/{BUCKET_NAME}/{path}"
+
+
+class LocalStorage(StorageBackend):
+    """Files on local disk, served by the /media static mount."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _full(self, path: str) -> Path:
+        full = (self.root / path).resolve()
+        if self.root.resolve() not in full.parents:
+            raise ValueError(f"Invalid storage path: {path}")
+        return full
+
+    def upload(self, path: str, data: bytes, content_type: str) -> None:
+        full = self._full(path)
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_bytes(data)
+
+    def list(self, folder: str) -> list[str]:
+        directory = self._full(folder)
+        if not directory.is_dir():
+            return []
+        return sorted(p.name for p in directory.iterdir() if p.is_file())
+
+    def delete(self, path: str) -> bool:
+        try:
+            self._full(path).unlink()
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def open(self, path: str) -> BinaryIO:
+        return open(self._full(path), "rb")
+
+    def public_url(self, path: str) -> str:
+        base = settings.PUBLIC_BASE_URL.rstrip("/")
+        rel = self.root.resolve().relative_to(MEDIA_DIR.resolve()).as_posix()
+        return f"{base}/media/{rel}/{path}"
+
+
+_backend: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the configured storage backend."""
+    global _backend
+    if _backend is None:
+        if settings.STORAGE_BACKEND == "local":
+            _backend = LocalStorage(MEDIA_DIR / settings.LOCAL_STORAGE_DIR)
+        elif settings.STORAGE_BACKEND == "supabase":
+            _backend = SupabaseStorage()
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}'")
+    return _backend
+
+
+# Storage clients are blocking; async routes hand calls to this pool so slow
+# uploads never stall the event loop or starve the default threadpool.
+_storage_executor = ThreadPoolExecutor(
+    max_workers=settings.STORAGE_IO_WORKERS,
+    thread_name_prefix="storage-io",
+)
+
+
+Gauge(
+    "storage_io_queue_depth",
+    "Storage calls waiting for a storage-io thread",
+    callback=lambda: _storage_executor._work_queue.qsize(),
+)
+
+
+async def run_storage(fn, *args, **kwargs):
+    """Run a blocking storage call on the storage thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_storage_executor, functools.partial(fn, *args, **kwargs))
 
 
 def _event_folder(event_id: str) -> str:
@@ -26,47 +185,113 @@ def _event_folder(event_id: str) -> str:
 
 
 def upload_image(event_id: str, file_bytes: bytes, filename: str, content_type: str) -> str:
-    """Upload an image to Supabase Storage and return the public URL."""
-    sb = get_supabase()
+    """Upload an image to storage and return the public URL."""
+    backend = get_storage()
     ext = filename.rsplit(".", 1)[-1] if "." in filename else "png"
     unique_name = f"{uuid.uuid4().hex[:12]}.{ext}"
     path = f"{_event_folder(event_id)}/{unique_name}"
 
-    sb.storage.from_(BUCKET_NAME).upload(
-        path,
-        file_bytes,
-        file_options={"content-type": content_type},
-    )
-
-    public_url = sb.storage.from_(BUCKET_NAME).get_public_url(path)
-    return public_url
+    backend.upload(path, file_bytes, content_type)
+    image_list_cache.invalidate(event_id)
+    return backend.public_url(path)
 
 
 def list_images(event_id: str) -> list[str]:
-    """List all image URLs for an event."""
-    sb = get_supabase()
+    """List all image URLs for an event (cached per event)."""
+    cached = image_list_cache.get(event_id)
+    if cached is not None:
+        return list(cached)
+
+    backend = get_storage()
     folder = _event_folder(event_id)
 
     try:
-        files = sb.storage.from_(BUCKET_NAME).list(folder)
+        names = backend.list(folder)
     except Exception:
         return []
 
-    urls = []
-    for f in files:
-        name = f.get("name", "")
-        if name and not name.startswith("."):
-            url = sb.storage.from_(BUCKET_NAME).get_public_url(f"{folder}/{name}")
-            urls.append(url)
+    urls = [
+        backend.public_url(f"{folder}/{name}")
+        for name in names
+        if name and not name.startswith(".")
+    ]
+    image_list_cache.set(event_id, tuple(urls))
     return urls
 
 
 def delete_image(event_id: str, filename: str) -> bool:
     """Delete a specific image from storage."""
-    sb = get_supabase()
-    path = f"{_event_folder(event_id)}/{filename}"
-    try:
-        sb.storage.from_(BUCKET_NAME).remove([path])
-        return True
-    except Exception:
-        return False
+    deleted = get_storage().delete(f"{_event_folder(event_id)}/{filename}")
+    image_list_cache.invalidate(event_id)
+    return deleted
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client for templates hosted outside the storage backend
+# ---------------------------------------------------------------------------
+# One keep-alive pool for the process, opened and closed by the app lifespan
+# (or lazily by scripts), so renders don't pay DNS/TCP/TLS setup each time.
+
+_http_client: httpx.Client | None = None
+_http_lock = threading.Lock()
+
+
+def open_http_client() -> httpx.Client:
+    """Create the shared HTTP client if it does not exist yet."""
+    global _http_client
+    with _http_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                timeout=settings.HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                http2=importlib.util.find_spec("h2") is not None,
+                follow_redirects=True,
+            )
+        return _http_client
+
+
+def close_http_client() -> None:
+    global _http_client
+    with _http_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def _fetch(url: str) -> bytes:
+    """GET a URL, revalidating a previously fetched copy with a conditional GET."""
+    cached = template_fetch_cache.get(url)
+    headers = {}
+    if cached is not None:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    resp = open_http_client().get(url, headers=headers)
+    if resp.status_code == 304 and cached is not None:
+        template_fetch_cache.set(url, cached)
+        return cached[2]
+    resp.raise_for_status()
+
+    etag, last_modified = resp.headers.get("etag"), resp.headers.get("last-modified")
+    if etag or last_modified:
+        template_fetch_cache.set(url, (etag, last_modified, resp.content))
+    return resp.content
+
+
+def read_template_bytes(image_url: str) -> bytes:
+    """Return the bytes of a template image.
+
+    URLs produced by the configured backend are read through it directly;
+    anything else (e.g. an external URL) is fetched over the shared client.
+    """
+    backend = get_storage()
+    path = backend.path_from_url(image_url)
+    if path:
+        return backend.read(path)
+    return _fetch(image_url)
@@ -0,0 +1,90 @@
+"""Lightweight stage timing spans.
+
+A ``SpanRecorder`` collects named, timed spans (``with spans.span("decode"):``)
+for one unit of work such as a bulk generation run. It can summarize them per
+stage and export them as Chrome trace events, which open as a flame view in
+Perfetto (ui.perfetto.dev), chrome://tracing or speedscope.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from metrics import Histogram
+
+STAGE_SECONDS = Histogram(
+    "certificate_render_stage_seconds",
+    "Time spent in each certificate rendering stage",
+    ["stage"],
+)
+
+
+class SpanRecorder:
+    """Thread-safe collector of (name, start, duration) spans."""
+
+    def __init__(self, keep_events: bool = False):
+        self.keep_events = keep_events
+        self._origin = time.perf_counter()
+        self._stats: dict[str, list[float]] = {}  # name -> [count, total, max]
+        self._events: list[dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Time the ``with`` block as one span of stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    def record(self, name: str, start: float, duration: float, **args) -> None:
+        STAGE_SECONDS.observe(duration, stage=name)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                self._stats[name] = [1, duration, duration]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = max(stats[2], duration)
+            if self.keep_events:
+                event = {
+                    "name": name,
+                    "ph": "X",
+                    "ts": round((start - self._origin) * 1e6, 1),
+                    "dur": round(duration * 1e6, 1),
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+                if args:
+                    event["args"] = args
+                self._events.append(event)
+
+    def summary(self) -> dict[str, dict]:
+        """Per-stage count, total, mean and max in milliseconds."""
+        with self._lock:
+            items = list(self._stats.items())
+        return {
+            name: {
+                "count": int(count),
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3),
+                "max_ms": round(peak * 1000, 3),
+            }
+            for name, (count, total, peak) in items
+        }
+
+    def trace_events(self) -> list[dict]:
+        with self._lock:
+            return list(self._events)
+
+    def write_trace(self, path: Path) -> Path:
+        """Write spans as a Chrome trace event file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}))
+        return path
+
@@ -1,33 +1,78 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
+import { useSearchParams } from 'react-router-dom';
 import Button from '../components/ui/Button';
 import Card from '../components/ui/Card';
 import AnimatedSection from '../components/ui/AnimatedSection';
-import { Search, CheckCircle, XCircle, Calendar, User, Download } from 'lucide-react';
+import { Search, CheckCircle, XCircle, Calendar, User, Download, ShieldCheck } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
-import { verifyCertificate, CertificateVerifyResponse } from '../services/api';
+import { verifyCertificate, verifySignedCertificate, CertificateVerifyResponse, SignedVerifyResponse } from '../services/api';
 
 const Verify: React.FC = () => {
+  const [searchParams] = useSearchParams();
   const [certCode, setCertCode] = useState('');
-  const [status, setStatus] = useState<'idle' | 'loading' | 'success' | 'error'>('idle');
+  const [status, setStatus] = useState<'idle' | 'loading' | 'signed' | 'success' | 'error'>('idle');
   const [result, setResult] = useState<CertificateVerifyResponse | null>(null);
+  const [signed, setSigned] = useState<SignedVerifyResponse | null>(null);
   const [errorMessage, setErrorMessage] = useState('');
 
-  const handleVerify = async (e: React.FormEvent) => {
-    e.preventDefault();
-    if (!certCode.trim()) return;
+  const fail = (error: unknown) => {
+    setStatus('error');
+    setErrorMessage(error instanceof Error ? error.message : 'Verification failed');
+  };
 
+  // Online lookup against the certificate database
+  const runVerify = async (code: string) => {
     setStatus('loading');
     setResult(null);
     setErrorMessage('');
 
     try {
-      const certificate = await verifyCertificate(certCode.trim());
+      const certificate = await verifyCertificate(code);
       setResult(certificate);
       setStatus('success');
     } catch (error) {
-      setStatus('error');
-      setErrorMessage(error instanceof Error ? error.message : 'Verification failed');
+      fail(error);
+    }
+  };
+
+  // QR scans: the signed token alone proves authenticity, no database lookup
+  const runSignedVerify = async (code: string, token: string) => {
+    setStatus('loading');
+    setResult(null);
+    setSigned(null);
+    setErrorMessage('');
+
+    try {
+      const payload = await verifySignedCertificate(token);
+      if (payload.code.toUpperCase() !== code.toUpperCase()) {
+        throw new Error('Certificate signature does not match this code');
+      }
+      setSigned(payload);
+      setStatus('signed');
+    } catch (error) {
+      fail(error);
+    }
+  };
+
+  // Links from emails and QR codes: #/verify?code=...[&t=...]
+  useEffect(() => {
+    const code = searchParams.get('code')?.trim();
+    if (!code) return;
+    setCertCode(code);
+    const token = searchParams.get('t');
+    if (token) {
+      runSignedVerify(code, token);
+    } else {
+      runVerify(code);
     }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchParams]);
+
+  const handleVerify = async (e: React.FormEvent) => {
+    e.preventDefault();
+    if (!certCode.trim()) return;
+    setSigned(null);
+    await runVerify(certCode.trim());
   };
 
   return (
@@ -74,6 +119,43 @@ const Verify: React.FC = () => {
         </AnimatedSection>
 
         <AnimatePresence mode="wait">
+          {status === 'signed' && signed && (
+            <motion.div
+              initial={{ opacity: 0, y: 20, scale: 0.95 }}
+              animate={{ opacity: 1, y: 0, scale: 1 }}
+              exit={{ opacity: 0, y: -20 }}
+              transition={{ duration: 0.4 }}
+            >
+              <div className="relative bg-white dark:bg-slate-800 rounded-xl p-6 md:p-8 border border-emerald-100 dark:border-emerald-900/30 shadow-2xl">
+                <div className="flex items-center justify-center mb-6">
+                  <div className="w-16 h-16 bg-emerald-100 dark:bg-emerald-900/30 rounded-full flex items-center justify-center text-emerald-600 dark:text-emerald-400 mb-2">
+                    <ShieldCheck size={32} />
+                  </div>
+                </div>
+
+                <div className="text-center mb-6 border-b border-slate-100 dark:border-slate-700 pb-6">
+                  <h3 className="text-emerald-600 dark:text-emerald-400 font-bold tracking-widest uppercase text-sm mb-1">Signature Verified</h3>
+                  <h2 className="text-2xl font-bold text-slate-800 dark:text-white">{signed.workshopName}</h2>
+                  <p className="font-mono text-slate-500 dark:text-slate-400 text-xs mt-2">Code: {signed.code}</p>
+                </div>
+
+                <div className="text-sm">
+                  <p className="text-slate-400 text-xs uppercase font-bold mb-1 flex items-center"><Calendar size={12} className="mr-1" /> Issued On</p>
+                  <p className="font-bold text-slate-800 dark:text-slate-200">{signed.issueDate}</p>
+                </div>
+
+                <div className="mt-6 pt-4 border-t border-slate-100 dark:border-slate-700 text-center">
+                  <p className="text-xs text-slate-500 dark:text-slate-400 mb-3">
+                    This certificate was issued by ACM. Check the online record for the recipient, skills and revocation status.
+                  </p>
+                  <Button variant="outline" size="sm" onClick={() => runVerify(signed.code)}>
+                    Check online record
+                  </Button>
+                </div>
+              </div>
+            </motion.div>
+          )}
+
           {status === 'success' && result && (
             <motion.div
               initial={{ opacity: 0, y: 20, scale: 0.95 }}
@@ -94,6 +176,11 @@ const Verify: React.FC = () => {
                     <h3 className="text-emerald-600 dark:text-emerald-400 font-bold tracking-widest uppercase text-sm mb-1">Verified Authentic</h3>
                     <h2 className="text-2xl font-bold text-slate-800 dark:text-white">{result.workshopName}</h2>
                     <p className="font-mono text-slate-500 dark:text-slate-400 text-xs mt-2">Code: {result.code}</p>
+                    {signed && (
+                      <p className="inline-flex items-center gap-1 mt-2 text-emerald-600 dark:text-emerald-400 text-xs font-bold">
+                        <ShieldCheck size={14} /> QR signature verified
+                      </p>
+                    )}
                   </div>
 
                   <div className="grid grid-cols-2 gap-4 text-sm">
@@ -30,6 +30,14 @@ export interface CertificateVerifyResponse {
   certificateUrl: string | null;
 }
 
+export interface SignedVerifyResponse {
+  valid: boolean;
+  code: string;
+  workshopName: string;
+  issueDate: string;
+  nameMatches: boolean | null;
+}
+
 export interface Workshop {
   id: string;
   title: string;
@@ -156,6 +164,26 @@ export async function verifyCertificate(code: string): Promise<CertificateVerify
   return mapCertificateVerifyFromApi(data);
 }
 
+export async function verifySignedCertificate(token: string): Promise<SignedVerifyResponse> {
+  const response = await fetch(`${API_BASE_URL}/api/certificates/verify-signed?t=${encodeURIComponent(token)}`);
+
+  if (!response.ok) {
+    if (response.status === 400) {
+      throw new Error('Certificate signature is not valid');
+    }
+    throw new Error('Verification failed');
+  }
+
+  const data = await response.json();
+  return {
+    valid: data.valid,
+    code: data.code,
+    workshopName: data.workshop_name,
+    issueDate: data.issue_date,
+    nameMatches: data.name_matches ?? null,
+  };
+}
+
 export async function searchCertificates(email: string): Promise<CertificateVerifyResponse[]> {
   const response = await fetch(`${API_BASE_URL}/api/certificates/search?email=${encodeURIComponent(email)}`);
 